@@ -0,0 +1,101 @@
+import json
+import sys
+
+import cv2
+
+import utils.db
+from utils.render import render_images, tap_positions
+from utils.timeline import matchup_timeline, to_manifest
+from utils.store import exists, object_path
+from utils.summary import refresh_summary
+from utils.thumbs import save_image
+from utils.video import probe_video
+
+# ------------------------------------------------------------
+# ADD TIMELINE MANIFEST, KEY-FRAME STILLS, SIZED THUMBNAILS AND
+# CONTACT SHEET TO OLDER MATCHUPS
+#
+#   python backfill_matchup_stills.py [path/to/app.db]
+#
+# A missing manifest is recomputed from the two source clips (same
+# math the renderer uses); matchups whose source clips were deleted
+# are then skipped. The matchup video is decoded once, start to
+# end, and every image the renderer would have tapped is taken
+# from the frame shown at its position. Safe to re-run.
+# ------------------------------------------------------------
+if len(sys.argv) > 1:
+    utils.db.DB_PATH = sys.argv[1]
+
+conn = utils.db.db()
+
+rows = conn.execute("""
+    SELECT m.id, m.matchup_sha, m.manifest,
+           p.clip_sha, p.fps, s.clip_sha, s.fps, s.decision_frame
+    FROM matchups m
+    LEFT JOIN pitch_clips p ON p.id = m.pitch_clip_id
+    LEFT JOIN swing_clips s ON s.id = m.swing_clip_id
+    WHERE m.manifest IS NULL OR NOT EXISTS (
+        SELECT 1 FROM images i
+        WHERE i.owner='matchup' AND i.owner_id=m.id AND i.variant='sheet'
+    )
+""").fetchall()
+
+done = 0
+skipped = []
+for mid, m_sha, stored, p_sha, p_fps, s_sha, s_fps, decision in rows:
+    if not exists(m_sha) or not (stored or (exists(p_sha) and exists(s_sha))):
+        skipped.append(str(mid))
+        continue
+
+    if stored:
+        manifest = json.loads(stored)
+    else:
+        pitch_len = probe_video(object_path(p_sha))[1]
+        swing_len = probe_video(object_path(s_sha))[1]
+        manifest = to_manifest(matchup_timeline(min(p_fps, s_fps), pitch_len, swing_len, decision))
+        # older renders are constant frame rate: frame numbers are coded frames
+        manifest["version"] = 1
+
+    # middle of each hold, plus the render tap points
+    wanted = tap_positions(manifest)
+    for name, f in manifest["freezes"].items():
+        wanted.setdefault(f["frame"] + f["frames"] // 2, []).append("freeze_" + name)
+
+    # read sequentially (exact, no seek drift); a position shows the
+    # last frame whose timestamp is at or before it, which also
+    # covers VFR renders where a hold is two coded frames
+    fps = manifest["fps"]
+    tapped = {}
+    prev = None
+    cap = cv2.VideoCapture(object_path(m_sha))
+    while wanted:
+        ret, fr = cap.read()
+        pos = round(cap.get(cv2.CAP_PROP_POS_MSEC) * fps / 1000) if ret else None
+        for p in sorted(wanted):
+            if ret and p >= pos:
+                break
+            if prev is not None:
+                for name in wanted[p]:
+                    tapped[name] = prev
+            del wanted[p]
+        if not ret:
+            break
+        prev = fr
+    cap.release()
+
+    held = {n[len("freeze_"):]: fr for n, fr in tapped.items() if n.startswith("freeze_")}
+    thumb, images = render_images(tapped, held)
+    for variant, (data, w, h) in images.items():
+        save_image(conn, "matchup", mid, variant, data, w, h)
+
+    conn.execute("UPDATE matchups SET manifest=? WHERE id=?", (json.dumps(manifest), mid))
+    # swing length / key frames come from the manifest
+    refresh_summary(conn, mid)
+    conn.commit()
+    done += 1
+
+conn.close()
+
+print(f"Backfilled {done} matchups.")
+if skipped:
+    print("Skipped (missing video or source clip): " + ", ".join(skipped))
@@ -0,0 +1,37 @@
+import sys
+
+import utils.db
+from utils.thumbs import CLIP_TABLES, ensure_clip_thumbs
+
+# ------------------------------------------------------------
+# GENERATE STORED THUMBNAILS FOR CLIPS THAT PREDATE THEM
+#
+#   python backfill_thumbs.py [path/to/app.db]
+#
+# Safe to re-run: clips that already have thumbnails are skipped.
+# ------------------------------------------------------------
+if len(sys.argv) > 1:
+    utils.db.DB_PATH = sys.argv[1]
+
+conn = utils.db.db()
+
+done = 0
+failed = []
+for kind, table in CLIP_TABLES.items():
+    ids = [r[0] for r in conn.execute(
+        f"SELECT id FROM {table} c WHERE NOT EXISTS ("
+        f"SELECT 1 FROM images i WHERE i.owner=? AND i.owner_id=c.id)",
+        (kind,)
+    ).fetchall()]
+
+    for clip_id in ids:
+        if ensure_clip_thumbs(conn, kind, clip_id):
+            done += 1
+        else:
+            failed.append(f"{kind} {clip_id}")
+
+conn.close()
+
+print(f"Generated thumbnails for {done} clips.")
+if failed:
+    print("Could not read: " + ", ".join(failed))
@@ -0,0 +1,30 @@
+import hashlib
+import os
+import sys
+import urllib.request
+
+# ------------------------------------------------------------
+# VENDOR hls.js INTO static/js
+# play_matchup.html loads the player's HLS library from our own
+# /static, pinned to one release, instead of a floating CDN tag.
+#
+#   python fetch_hls_js.py [version]
+#
+# Bump HLS_VERSION (and re-run) to upgrade. Without the file the
+# player still works: native HLS on Safari / iOS, the MP4 elsewhere.
+# ------------------------------------------------------------
+HLS_VERSION = sys.argv[1] if len(sys.argv) > 1 else "1.5.20"
+URL = f"https://cdn.jsdelivr.net/npm/hls.js@{HLS_VERSION}/dist/hls.min.js"
+DEST = os.path.join("static", "js", "hls.min.js")
+
+with urllib.request.urlopen(URL, timeout=60) as resp:
+    data = resp.read()
+
+# jsdelivr answers an unknown version with an error page, not a 404
+if b"Hls" not in data:
+    sys.exit(f"{URL} did not return hls.js")
+
+with open(DEST, "wb") as f:
+    f.write(f"/* hls.js {HLS_VERSION} */\n".encode() + data)
+
+print(f"Wrote {DEST}: hls.js {HLS_VERSION}, sha256 {hashlib.sha256(data).hexdigest()}")
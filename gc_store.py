@@ -0,0 +1,25 @@
+import sys
+
+import utils.db
+from utils.store import gc
+
+# ------------------------------------------------------------
+# DELETE MEDIA STORE OBJECTS THAT NO ROW REFERENCES
+#
+#   python gc_store.py [path/to/app.db] [--dry-run]
+#
+# The database is opened through utils.db, which applies pending
+# migrations first: every table in store.REFERENCES exists before
+# anything is collected.
+# ------------------------------------------------------------
+args = [a for a in sys.argv[1:] if not a.startswith("--")]
+if args:
+    utils.db.DB_PATH = args[0]
+dry_run = "--dry-run" in sys.argv
+
+conn = utils.db.db()
+removed, freed = gc(conn, dry_run=dry_run)
+conn.close()
+
+verb = "Would remove" if dry_run else "Removed"
+print(f"{verb} {removed} objects ({freed / 1e6:.1f} MB).")
@@ -0,0 +1,30 @@
+import sqlite3
+import sys
+
+from utils.migrations import migrate, move_payloads
+
+# ------------------------------------------------------------
+# MOVE VIDEO/THUMBNAIL BLOBs OUT OF app.db
+# into the content-addressed media store (utils/store.py).
+#
+#   python migrate_blobs.py [path/to/app.db]
+#
+# The app refuses a database that still needs this (it would hold
+# the write lock for the whole copy). Moves in small batches
+# (utils/migrations.move_payloads), applies pending migrations and
+# then VACUUMs, giving the freed pages back to the filesystem.
+# Safe to interrupt and re-run.
+# ------------------------------------------------------------
+DB_PATH = sys.argv[1] if len(sys.argv) > 1 else "app.db"
+
+conn = sqlite3.connect(DB_PATH)
+moved = move_payloads(conn)
+print(f"Moved {moved} payloads into the media store.")
+
+applied = migrate(conn)
+print(f"Applied migrations: {applied or 'none pending'}")
+
+conn.execute("VACUUM")
+conn.close()
+
+print("Migration complete.")
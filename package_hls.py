@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+import utils.db
+from utils.hls import package_hls, save_hls
+from utils.store import exists, object_path
+from utils.video import probe_video
+from utils.workspace import job_workspace
+
+# ------------------------------------------------------------
+# PACKAGE OLDER MATCHUPS AS HLS LADDERS
+#
+#   python package_hls.py [path/to/app.db]
+#
+# Matchups rendered before HLS packaging (no hls_sha) get the same
+# ladder new renders get. Safe to re-run.
+# ------------------------------------------------------------
+if len(sys.argv) > 1:
+    utils.db.DB_PATH = sys.argv[1]
+
+conn = utils.db.db()
+
+rows = conn.execute(
+    "SELECT id, matchup_sha, manifest FROM matchups WHERE hls_sha IS NULL"
+).fetchall()
+
+done = 0
+skipped = []
+for mid, m_sha, manifest in rows:
+    if not exists(m_sha):
+        skipped.append(str(mid))
+        continue
+
+    # matchups older than the manifest: 1280x720, fps from the file
+    m = json.loads(manifest) if manifest else {
+        "fps": probe_video(object_path(m_sha))[0], "width": 1280, "height": 720,
+    }
+
+    with job_workspace("hls") as ws:
+        master_sha, shas = package_hls(
+            ws, object_path(m_sha), m["fps"], m["width"], m["height"],
+            workers=os.cpu_count() or 1,
+        )
+
+    if master_sha:
+        save_hls(conn, mid, master_sha, shas)
+        conn.commit()
+        done += 1
+
+conn.close()
+
+print(f"Packaged {done} matchups.")
+if skipped:
+    print("Skipped (missing video): " + ", ".join(skipped))
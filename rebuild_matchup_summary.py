@@ -0,0 +1,24 @@
+import sys
+
+import utils.db
+from utils.summary import rebuild_summary
+
+# ------------------------------------------------------------
+# REBUILD THE MATCHUP SUMMARY
+#
+#   python rebuild_matchup_summary.py [path/to/app.db]
+#
+# Recomputes every matchup_summary row from matchups, clips,
+# players and teams, and drops rows of deleted matchups. Only
+# needed if the table drifted (rows edited by hand, a write made
+# by older code); the app keeps it current. Safe to re-run.
+# ------------------------------------------------------------
+if len(sys.argv) > 1:
+    utils.db.DB_PATH = sys.argv[1]
+
+conn = utils.db.db()
+rows = rebuild_summary(conn)
+conn.commit()
+conn.close()
+
+print(f"Rebuilt summary of {rows} matchups.")
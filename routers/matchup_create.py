@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Form
 from fastapi.responses import RedirectResponse
 
+from utils.jobs import enqueue
+
 router = APIRouter()
 
 # ============================================================
 # RECEIVE POST FROM matchup_select.html
-# REDIRECT INTO /matchup/build WITH QUERY PARAMS
+# QUEUE A BACKGROUND RENDER AND SHOW ITS PROGRESS PAGE
 # ============================================================
 @router.post("/matchup/create")
 def matchup_create(
@@ -14,14 +16,9 @@ def matchup_create(
     swing_id: int = Form(...),
     description: str = Form("")
 ):
-    print("DEBUG >>> MATCHUP CREATE CALLED")
-    print("DEBUG >>> pitch_id:", pitch_id)
-    print("DEBUG >>> swing_id:", swing_id)
-    print("DEBUG >>> description:", description)
-
-    # Redirect to the GET /matchup/build route
-    # (matchup_build.py now correctly uses @router.get("/matchup/build"))
-    return RedirectResponse(
-        f"/matchup/build?sid={sid}&pitch_id={pitch_id}&swing_id={swing_id}&description={description}",
-        status_code=303
+    job_id = enqueue(
+        "matchup",
+        {"pitch_id": pitch_id, "swing_id": swing_id, "description": description}
     )
+
+    return RedirectResponse(f"/matchup/job?id={job_id}&sid={sid}", status_code=303)
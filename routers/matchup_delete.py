@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Form
 from fastapi.responses import RedirectResponse
 from utils.db import db
+from utils.hls import delete_hls
+from utils.summary import delete_summary
+from utils.thumbs import delete_images
 
 router = APIRouter()
 
@@ -8,6 +11,9 @@ router = APIRouter()
 def matchup_delete(id: int = Form(...), sid: str = Form("x")):
     conn = db()
     conn.execute("DELETE FROM matchups WHERE id=?", (id,))
+    delete_images(conn, "matchup", id)
+    delete_hls(conn, id)
+    delete_summary(conn, id)
     conn.commit()
     conn.close()
 
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import Response, HTMLResponse
 from utils.db import db
-import tempfile
+from utils.mp4index import clip_index, decode_frame
+from utils.store import exists, object_path
+from utils.streaming import stream_file
 import cv2
-import os
 
 router = APIRouter()
 
@@ -12,22 +13,19 @@ router = APIRouter()
 # DOWNLOAD: FULL MATCHUP VIDEO
 # ------------------------------------------------------------
 @router.get("/download/matchup")
-def download_matchup(id: int):
+def download_matchup(request: Request, id: int):
     conn = db()
     row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?",
+        "SELECT matchup_sha FROM matchups WHERE id=?",
         (id,)
     ).fetchone()
     conn.close()
 
-    if not row:
+    if not row or not exists(row[0]):
         return HTMLResponse("Matchup not found", status_code=404)
 
-    blob = row[0]
-
-    return Response(
-        content=blob,
-        media_type="video/mp4",
+    return stream_file(
+        request, object_path(row[0]), "video/mp4", etag=row[0],
         headers={
             "Content-Disposition": f'attachment; filename="matchup_{id}.mp4"'
         }
@@ -35,23 +33,28 @@ def download_matchup(id: int):
 
 
 # ------------------------------------------------------------
-# INTERNAL: Extract a frame JPG from a blob
+# INTERNAL: Extract a frame JPG from a stored clip
+# Clips are all-intra, so the frame is decoded from its own sample
+# via the MP4 sample index; decoder seeking is only the fallback
+# for a clip the index cannot describe.
 # ------------------------------------------------------------
-def extract_frame_jpg(blob, frame_index):
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-    with open(tmp, "wb") as f:
-        f.write(blob)
-
-    cap = cv2.VideoCapture(tmp)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-    ret, fr = cap.read()
-    cap.release()
-    try:
-        os.remove(tmp)
-    except:
-        pass
-
-    if not ret or fr is None:
+def extract_frame_jpg(table, clip_id, frame_index):
+    conn = db()
+    path, index = clip_index(conn, table, clip_id)
+    conn.close()
+
+    if path is None:
+        return None
+
+    if index:
+        fr = decode_frame(path, index, frame_index)
+    else:
+        cap = cv2.VideoCapture(path)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, fr = cap.read()
+        cap.release()
+
+    if fr is None:
         return None
 
     ok, jpg = cv2.imencode(".jpg", fr)
@@ -70,7 +73,7 @@ def download_pitch_start(id: int):
     conn = db()
     row = conn.execute(
         """
-        SELECT pitch_clips.clip_blob
+        SELECT matchups.pitch_clip_id
         FROM matchups
         JOIN pitch_clips ON matchups.pitch_clip_id = pitch_clips.id
         WHERE matchups.id=?
@@ -82,8 +85,7 @@ def download_pitch_start(id: int):
     if not row:
         return HTMLResponse("Matchup or pitch clip not found", status_code=404)
 
-    blob = row[0]
-    jpg = extract_frame_jpg(blob, 0)
+    jpg = extract_frame_jpg("pitch_clips", row[0], 0)
     if jpg is None:
         return HTMLResponse("Could not extract frame", status_code=500)
 
@@ -109,7 +111,7 @@ def download_pitch_decision(id: int):
     conn = db()
     row = conn.execute(
         """
-        SELECT pitch_clips.clip_blob,
+        SELECT matchups.pitch_clip_id,
                swing_clips.decision_frame
         FROM matchups
         JOIN pitch_clips ON matchups.pitch_clip_id = pitch_clips.id
@@ -123,12 +125,12 @@ def download_pitch_decision(id: int):
     if not row:
         return HTMLResponse("Matchup not found", status_code=404)
 
-    pitch_blob, decision_frame = row
+    pitch_id, decision_frame = row
 
     if decision_frame < 0:
         decision_frame = 0
 
-    jpg = extract_frame_jpg(pitch_blob, decision_frame)
+    jpg = extract_frame_jpg("pitch_clips", pitch_id, decision_frame)
     if jpg is None:
         return HTMLResponse("Could not extract frame", status_code=500)
 
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from utils.db import db
+from utils.jobs import active_jobs
+from utils.paging import keyset_page, page_url
 
 router = APIRouter()
 templates = Jinja2Templates("templates")
@@ -9,20 +11,84 @@ templates = Jinja2Templates("templates")
 
 # ------------------------------------------------------------
 # GET /library/matchups
-# Full filtering:
-#   pitcher team → pitcher → pitch
-#   hitter team → hitter → swing
+# Server-side filters:
+#   pitcher team → pitcher, hitter team → hitter, description text
+# First page only, newest first; /library/matchups/rows serves the
+# following pages as HTML fragments (see utils/paging.py).
 # ------------------------------------------------------------
+# one indexed table, no joins (utils/summary.py)
+MATCHUP_ROWS = """
+    SELECT
+        matchup_id,
+        pitch_clip_id,
+        swing_clip_id,
+        description,
+        created_at,
+        pitcher_team,
+        pitcher_name,
+        hitter_team,
+        hitter_name,
+        swing_sec
+    FROM matchup_summary
+"""
+
+
+def matchup_page(conn, sid, pitcher_team, pitcher_id, hitter_team, hitter_id, q, cursor):
+    """Context for library_matchups_rows.html: one page plus the link to the next."""
+    filters = []
+    params = []
+
+    if pitcher_team != "all":
+        filters.append("pitcher_team_id = ?")
+        params.append(pitcher_team)
+
+    if pitcher_id != "all":
+        filters.append("pitcher_id = ?")
+        params.append(pitcher_id)
+
+    if hitter_team != "all":
+        filters.append("hitter_team_id = ?")
+        params.append(hitter_team)
+
+    if hitter_id != "all":
+        filters.append("hitter_id = ?")
+        params.append(hitter_id)
+
+    if q.strip():
+        filters.append("description LIKE ?")
+        params.append(f"%{q.strip()}%")
+
+    matchups, next_cursor = keyset_page(
+        conn, MATCHUP_ROWS, filters, params, cursor,
+        key=lambda r: (r[4], r[0]), row_id="matchup_id",
+    )
+
+    query = {
+        "sid": sid,
+        "pitcher_team": pitcher_team,
+        "pitcher_id": pitcher_id,
+        "hitter_team": hitter_team,
+        "hitter_id": hitter_id,
+        "q": q,
+    }
+    return {
+        "sid": sid,
+        "matchups": matchups,
+        "next_rows": next_cursor and page_url("/library/matchups/rows", next_cursor, **query),
+        "next_page": next_cursor and page_url("/library/matchups", next_cursor, **query),
+    }
+
+
 @router.get("/library/matchups", response_class=HTMLResponse)
 def library_matchups(
     request: Request,
     sid: str = "x",
     pitcher_team: str = "all",
     pitcher_id: str = "all",
-    pitch_id: str = "all",
     hitter_team: str = "all",
     hitter_id: str = "all",
-    swing_id: str = "all",
+    q: str = "",
+    cursor: str = "",
 ):
 
     conn = db()
@@ -56,120 +122,56 @@ def library_matchups(
         ).fetchall()
 
     # ------------------------------------------------------------
-    # FETCH PITCH CLIPS (filtered)
-    # ------------------------------------------------------------
-    pitch_query = """
-        SELECT id, team_id, pitcher_id, description, fps, created_at
-        FROM pitch_clips
-    """
-    pitch_params = []
-    pitch_filters = []
-
-    if pitcher_id != "all":
-        pitch_filters.append("pitcher_id=?")
-        pitch_params.append(pitcher_id)
-
-    if pitcher_team != "all":
-        pitch_filters.append("team_id=?")
-        pitch_params.append(pitcher_team)
-
-    if pitch_filters:
-        pitch_query += " WHERE " + " AND ".join(pitch_filters)
-
-    pitch_query += " ORDER BY created_at DESC"
-    pitch_clips = cur.execute(pitch_query, pitch_params).fetchall()
-
-    # ------------------------------------------------------------
-    # FETCH SWING CLIPS (filtered)
+    # FETCH MATCHUPS (first page)
     # ------------------------------------------------------------
-    swing_query = """
-        SELECT id, team_id, hitter_id, description, fps, created_at
-        FROM swing_clips
-    """
-    swing_params = []
-    swing_filters = []
+    page = matchup_page(conn, sid, pitcher_team, pitcher_id, hitter_team, hitter_id, q, cursor)
 
-    if hitter_id != "all":
-        swing_filters.append("hitter_id=?")
-        swing_params.append(hitter_id)
-
-    if hitter_team != "all":
-        swing_filters.append("team_id=?")
-        swing_params.append(hitter_team)
-
-    if swing_filters:
-        swing_query += " WHERE " + " AND ".join(swing_filters)
-
-    swing_query += " ORDER BY created_at DESC"
-    swing_clips = cur.execute(swing_query, swing_params).fetchall()
+    conn.close()
 
     # ------------------------------------------------------------
-    # FETCH MATCHUPS
+    # RENDERS STILL IN PROGRESS
     # ------------------------------------------------------------
-    matchups = cur.execute(
-        """
-        SELECT 
-            m.id, 
-            m.pitch_clip_id, 
-            m.swing_clip_id, 
-            m.description, 
-            m.created_at,
-    
-            pt.team_name AS pitcher_team,
-            pt.pitcher_name AS pitcher_name,
-            ht.team_name AS hitter_team,
-            ht.hitter_name AS hitter_name
-    
-        FROM matchups m
-    
-        JOIN (
-            SELECT 
-                pc.id AS pitch_clip_id,
-                t.name AS team_name,
-                p.name AS pitcher_name
-            FROM pitch_clips pc
-            JOIN pitchers p ON p.id = pc.pitcher_id
-            JOIN teams t ON t.id = p.team_id
-        ) pt ON pt.pitch_clip_id = m.pitch_clip_id
-    
-        JOIN (
-            SELECT 
-                sc.id AS swing_clip_id,
-                t.name AS team_name,
-                h.name AS hitter_name
-            FROM swing_clips sc
-            JOIN hitters h ON h.id = sc.hitter_id
-            JOIN teams t ON t.id = h.team_id
-        ) ht ON ht.swing_clip_id = m.swing_clip_id
-    
-        ORDER BY m.created_at DESC
-        """
-    ).fetchall()
-
-    conn.close()
+    jobs = active_jobs("matchup")
 
     return templates.TemplateResponse(
         "library_matchups.html",
         {
             "request": request,
-            "sid": sid,
 
             # all filter sources
             "teams": teams,
             "pitchers": pitchers,
             "hitters": hitters,
-            "pitch_clips": pitch_clips,
-            "swing_clips": swing_clips,
 
             # current filter values
             "pitcher_team": pitcher_team,
             "pitcher_id": pitcher_id,
-            "pitch_id": pitch_id,
             "hitter_team": hitter_team,
             "hitter_id": hitter_id,
-            "swing_id": swing_id,
+            "q": q,
 
             # matchups
-            "matchups": matchups,
+            **page,
+            "jobs": jobs,
         }
     )
+
+
+@router.get("/library/matchups/rows", response_class=HTMLResponse)
+def library_matchups_rows(
+    request: Request,
+    sid: str = "x",
+    pitcher_team: str = "all",
+    pitcher_id: str = "all",
+    hitter_team: str = "all",
+    hitter_id: str = "all",
+    q: str = "",
+    cursor: str = "",
+):
+    conn = db()
+    page = matchup_page(conn, sid, pitcher_team, pitcher_id, hitter_team, hitter_id, q, cursor)
+    conn.close()
+
+    return templates.TemplateResponse(
+        "library_matchups_rows.html", {"request": request, **page}
+    )
@@ -1,12 +1,11 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
-import sqlite3
-import re
-import tempfile
-import cv2
-import io
 from utils.db import db
+from utils.hls import CACHE_CONTROL as HLS_CACHE_CONTROL, CONTENT_TYPES as HLS_TYPES, url
+from utils.store import exists, object_path
+from utils.streaming import stream_file
+from utils.thumbs import CACHE_CONTROL, ensure_first_pitch, get_image
 
 router = APIRouter()
 templates = Jinja2Templates("templates")
@@ -17,9 +16,15 @@ templates = Jinja2Templates("templates")
 # ============================================================
 @router.get("/play/matchup", response_class=HTMLResponse)
 def play_matchup(request: Request, id: int, sid: str = "x"):
+    conn = db()
+    row = conn.execute("SELECT hls_sha FROM matchups WHERE id=?", (id,)).fetchone()
+    conn.close()
+
+    hls_url = url(row[0], "m3u8") if row and row[0] else None
+
     return templates.TemplateResponse(
         "play_matchup.html",
-        {"request": request, "sid": sid, "id": id}
+        {"request": request, "sid": sid, "id": id, "hls_url": hls_url}
     )
 
 
@@ -30,58 +35,39 @@ def play_matchup(request: Request, id: int, sid: str = "x"):
 def stream_matchup(request: Request, id: int):
     conn = db()
     row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?", (id,)
+        "SELECT matchup_sha FROM matchups WHERE id=?", (id,)
     ).fetchone()
     conn.close()
 
-    if not row:
+    if not row or not exists(row[0]):
         return HTMLResponse("not found", status_code=404)
 
-    blob = row[0]
-    size = len(blob)
-
-    range_header = request.headers.get("range")
-    if not range_header:
-        return Response(
-            content=blob,
-            status_code=200,
-            headers={
-                "Content-Type": "video/mp4",
-                "Content-Length": str(size),
-                "Accept-Ranges": "bytes",
-            },
-        )
-
-    match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-    if not match:
-        return Response(
-            content=blob,
-            status_code=200,
-            headers={
-                "Content-Type": "video/mp4",
-                "Content-Length": str(size),
-                "Accept-Ranges": "bytes",
-            },
-        )
-
-    start = int(match.group(1))
-    end = match.group(2)
-    end = size - 1 if end == "" else int(end)
-
-    if start > end or start >= size:
-        return Response(status_code=416)
-
-    chunk = blob[start: end + 1]
-
-    return Response(
-        content=chunk,
-        status_code=206,
-        headers={
-            "Content-Type": "video/mp4",
-            "Content-Range": f"bytes {start}-{end}/{size}",
-            "Content-Length": str(len(chunk)),
-            "Accept-Ranges": "bytes",
-        },
+    # bounded-memory range serving straight from the media store
+    return stream_file(request, object_path(row[0]), "video/mp4", etag=row[0])
+
+
+# ============================================================
+# HLS PLAYLISTS + SEGMENTS  (utils/hls.py)
+# Content-addressed: /hls/<sha>.<ext> never changes, so it is
+# served with a long immutable Cache-Control. Only objects that
+# belong to a matchup's package are served.
+# ============================================================
+@router.get("/hls/{name}")
+def hls_object(request: Request, name: str):
+    sha, _, ext = name.partition(".")
+    if ext not in HLS_TYPES:
+        return HTMLResponse("not found", status_code=404)
+
+    conn = db()
+    row = conn.execute("SELECT 1 FROM matchup_hls WHERE sha=? LIMIT 1", (sha,)).fetchone()
+    conn.close()
+
+    if not row or not exists(sha):
+        return HTMLResponse("not found", status_code=404)
+
+    return stream_file(
+        request, object_path(sha), HLS_TYPES[ext], etag=sha,
+        headers={"Cache-Control": HLS_CACHE_CONTROL},
     )
 
 
@@ -89,21 +75,18 @@ def stream_matchup(request: Request, id: int):
 # FULL MATCHUP DOWNLOAD  (RENAMED TO PREVENT COLLISION)
 # ============================================================
 @router.get("/play/matchup/download")
-def download_matchup(id: int):
+def download_matchup(request: Request, id: int):
     conn = db()
     row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?", (id,)
+        "SELECT matchup_sha FROM matchups WHERE id=?", (id,)
     ).fetchone()
     conn.close()
 
-    if not row:
+    if not row or not exists(row[0]):
         return HTMLResponse("not found", status_code=404)
 
-    blob = row[0]
-
-    return Response(
-        content=blob,
-        media_type="video/mp4",
+    return stream_file(
+        request, object_path(row[0]), "video/mp4", etag=row[0],
         headers={
             "Content-Disposition": f'attachment; filename="matchup_{id}.mp4"'
         }
@@ -111,163 +94,99 @@ def download_matchup(id: int):
 
 
 # ============================================================
-# DOWNLOAD PITCH START IMAGE (RENAMED TO PREVENT COLLISION)
+# KEY-FRAME STILLS
+# Captured while the matchup was rendered (utils/render.py) and
+# stored as images rows (owner "matchup"):
+#   start | decision | contact           full 1280x720 freeze frame
+#   start_pitch | decision_pitch | ...   pitch half only
 # ============================================================
-@router.get("/play/matchup/pitch_start")
-def download_pitch_start(id: int):
+STILLS = ("start", "decision", "contact")
+
 
+def still_response(request, id, variant, filename=None):
     conn = db()
-    row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?", (id,)
-    ).fetchone()
+    img = get_image(conn, "matchup", id, variant)
     conn.close()
+    return image_response(request, img, filename)
+
 
-    if not row:
+def image_response(request, img, filename=None):
+    if not img or not exists(img[0]):
         return HTMLResponse("not found", status_code=404)
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    tmp.write(row[0])
-    tmp.close()
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
 
-    cap = cv2.VideoCapture(tmp.name)
-    ret, frame = cap.read()
-    cap.release()
+    return stream_file(request, object_path(img[0]), "image/jpeg", etag=img[0], headers=headers)
 
-    if not ret:
-        return HTMLResponse("cannot read first frame", status_code=500)
 
-    pitch_frame = frame[:, :640]
+@router.get("/play/matchup/still")
+def matchup_still(request: Request, id: int, name: str, part: str = "full", download: int = 0):
+    if name not in STILLS or part not in ("full", "pitch"):
+        return HTMLResponse("unknown still", status_code=400)
 
-    ok, jpg = cv2.imencode(".jpg", pitch_frame)
-    return Response(
-        content=jpg.tobytes(),
-        media_type="image/jpeg",
-        headers={"Content-Disposition": f'attachment; filename="pitch_start_{id}.jpg"'}
-    )
+    variant = name if part == "full" else f"{name}_{part}"
+    filename = f"{variant}_{id}.jpg" if download else None
+    return still_response(request, id, variant, filename)
 
 
-# ============================================================
-# DOWNLOAD PITCH DECISION IMAGE (RENAMED TO PREVENT COLLISION)
-# ============================================================
-@router.get("/play/matchup/pitch_decision")
-def download_pitch_decision(id: int):
+# ------------------------------------------------------------
+# CONTACT SHEET  (frames across the whole matchup, one strip)
+# ------------------------------------------------------------
+@router.get("/play/matchup/sheet")
+def matchup_sheet(request: Request, id: int):
+    return still_response(request, id, "sheet")
+
 
+@router.get("/play/matchup/manifest")
+def matchup_manifest(id: int):
     conn = db()
-    row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?", (id,)
-    ).fetchone()
+    row = conn.execute("SELECT manifest FROM matchups WHERE id=?", (id,)).fetchone()
     conn.close()
 
-    if not row:
+    if not row or not row[0]:
         return HTMLResponse("not found", status_code=404)
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    tmp.write(row[0])
-    tmp.close()
+    return Response(content=row[0], media_type="application/json")
 
-    cap = cv2.VideoCapture(tmp.name)
-    fps = cap.get(cv2.CAP_PROP_FPS)
 
-    decision_img = None
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+# ============================================================
+# DOWNLOAD PITCH START IMAGE (RENAMED TO PREVENT COLLISION)
+# The pitch half of the video's first frame, as it always was; the
+# start freeze is /play/matchup/still?name=start&part=pitch.
+# ============================================================
+def first_pitch_response(request, id, filename=None):
+    conn = db()
+    img = ensure_first_pitch(conn, id)
+    conn.close()
+    return image_response(request, img, filename)
 
-    for i in range(total):
-        ret, fr = cap.read()
-        if not ret:
-            break
 
-        pitch_half = fr[:, :640]
-        px = pitch_half[5, 5]
+@router.get("/play/matchup/pitch_start")
+def download_pitch_start(request: Request, id: int):
+    return first_pitch_response(request, id, f"pitch_start_{id}.jpg")
 
-        if px[1] > 200 and px[0] < 50 and px[2] < 50:
-            decision_img = pitch_half
-            break
 
-    if decision_img is None:
-        return HTMLResponse("cannot locate decision frame", status_code=500)
+# ============================================================
+# DOWNLOAD PITCH DECISION IMAGE (RENAMED TO PREVENT COLLISION)
+# ============================================================
+@router.get("/play/matchup/pitch_decision")
+def download_pitch_decision(request: Request, id: int):
+    return still_response(request, id, "decision_pitch", f"pitch_decision_{id}.jpg")
 
-    ok, jpg = cv2.imencode(".jpg", decision_img)
-    return Response(
-        content=jpg.tobytes(),
-        media_type="image/jpeg",
-        headers={"Content-Disposition": f'attachment; filename="pitch_decision_{id}.jpg"'}
-    )
 
 # =========================================
 # INLINE PITCH START IMAGE (VIEW, NOT DOWNLOAD)
 # =========================================
 @router.get("/play/matchup/pitch_start_img")
-def view_pitch_start_img(id: int):
-    conn = db()
-    row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?", (id,)
-    ).fetchone()
-    conn.close()
-
-    if not row:
-        return HTMLResponse("not found", status_code=404)
-
-    # read first frame
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    tmp.write(row[0]); tmp.close()
-
-    cap = cv2.VideoCapture(tmp.name)
-    ret, frame = cap.read()
-    cap.release()
-
-    if not ret:
-        return HTMLResponse("cannot read first frame", status_code=500)
-
-    pitch_frame = frame[:, :640]
-    ok, jpg = cv2.imencode(".jpg", pitch_frame)
-
-    return Response(
-        content=jpg.tobytes(),
-        media_type="image/jpeg"
-    )
+def view_pitch_start_img(request: Request, id: int):
+    return first_pitch_response(request, id)
 
 
 # =========================================
 # INLINE PITCH DECISION IMAGE (VIEW, NOT DOWNLOAD)
 # =========================================
 @router.get("/play/matchup/pitch_decision_img")
-def view_pitch_decision_img(id: int):
-    conn = db()
-    row = conn.execute(
-        "SELECT matchup_blob FROM matchups WHERE id=?", (id,)
-    ).fetchone()
-    conn.close()
-
-    if not row:
-        return HTMLResponse("not found", status_code=404)
-
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    tmp.write(row[0]); tmp.close()
-
-    cap = cv2.VideoCapture(tmp.name)
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    decision_img = None
-    for _ in range(total):
-        ret, fr = cap.read()
-        if not ret:
-            break
-
-        pitch_half = fr[:, :640]
-        px = pitch_half[5, 5]
-
-        if px[1] > 200 and px[0] < 50 and px[2] < 50:
-            decision_img = pitch_half
-            break
-
-    cap.release()
-
-    if decision_img is None:
-        return HTMLResponse("cannot locate decision frame", status_code=500)
-
-    ok, jpg = cv2.imencode(".jpg", decision_img)
-
-    return Response(
-        content=jpg.tobytes(),
-        media_type="image/jpeg"
-    )
+def view_pitch_decision_img(request: Request, id: int):
+    return still_response(request, id, "decision_pitch")
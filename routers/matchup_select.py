@@ -2,97 +2,85 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from utils.db import db
+from utils.json_api import json_response
 
 router = APIRouter()
 templates = Jinja2Templates("templates")
 
 
+# ------------------------------------------------------------
+# GET /matchup/select
+# Only the teams are in the page; each team → player → clip
+# branch is fetched from the JSON endpoints below when picked.
+# ------------------------------------------------------------
 @router.get("/matchup/select", response_class=HTMLResponse)
 def matchup_select(request: Request, sid: str = "x"):
     conn = db()
-    cur = conn.cursor()
 
-    # ------------------------------
-    # LOAD TEAMS
-    # ------------------------------
-    teams = cur.execute(
+    teams = conn.execute(
         "SELECT id, name FROM teams ORDER BY name"
     ).fetchall()
 
-    # ------------------------------
-    # BUILD PITCHER MAP
-    # ------------------------------
-    pitcher_rows = cur.execute(
-        "SELECT id, name, team_id FROM pitchers ORDER BY name"
-    ).fetchall()
+    conn.close()
 
-    pitcher_map = {}
-    for pid, name, tid in pitcher_rows:
-        tid = str(tid)
-        if tid not in pitcher_map:
-            pitcher_map[tid] = []
-        pitcher_map[tid].append({"id": pid, "name": name})
-
-    # ------------------------------
-    # BUILD PITCH CLIP MAP
-    # ------------------------------
-    clip_rows = cur.execute(
-        "SELECT id, pitcher_id, description, fps, created_at "
-        "FROM pitch_clips ORDER BY created_at DESC"
+    return templates.TemplateResponse(
+        "matchup_select.html",
+        {
+            "request": request,
+            "sid": sid,
+            "teams": teams,
+        },
+    )
+
+
+# ------------------------------------------------------------
+# SELECTOR LOOKUPS (JSON, ETag + 304, see utils/json_api.py)
+#   /matchup/select/pitchers?team_id=      [{id, name}]
+#   /matchup/select/hitters?team_id=       [{id, name}]
+#   /matchup/select/pitch_clips?pitcher_id=  [{id, label}], newest first
+#   /matchup/select/swing_clips?hitter_id=   [{id, label}], newest first
+# ------------------------------------------------------------
+def players(request, table, team_id):
+    conn = db()
+    rows = conn.execute(
+        f"SELECT id, name FROM {table} WHERE team_id=? ORDER BY name",
+        (team_id,)
     ).fetchall()
+    conn.close()
 
-    pitch_clip_map = {}
-    for cid, pid, desc, fps, created in clip_rows:
-        pid = str(pid)
-        if pid not in pitch_clip_map:
-            pitch_clip_map[pid] = []
+    return json_response(request, [{"id": pid, "name": name} for pid, name in rows])
 
-        label = f"{created[:10]} – {desc or f'Pitch {cid}'}"
-        pitch_clip_map[pid].append({"id": cid, "label": label})
 
-    # ------------------------------
-    # BUILD HITTER MAP
-    # ------------------------------
-    hitter_rows = cur.execute(
-        "SELECT id, name, team_id FROM hitters ORDER BY name"
+def clips(request, table, player_col, player_id, kind):
+    conn = db()
+    rows = conn.execute(
+        f"SELECT id, description, created_at FROM {table} "
+        f"WHERE {player_col}=? ORDER BY created_at DESC",
+        (player_id,)
     ).fetchall()
+    conn.close()
 
-    hitter_map = {}
-    for hid, name, tid in hitter_rows:
-        tid = str(tid)
-        if tid not in hitter_map:
-            hitter_map[tid] = []
-        hitter_map[tid].append({"id": hid, "name": name})
-
-    # ------------------------------
-    # BUILD SWING CLIP MAP
-    # ------------------------------
-    swing_rows = cur.execute(
-        "SELECT id, hitter_id, description, fps, created_at "
-        "FROM swing_clips ORDER BY created_at DESC"
-    ).fetchall()
+    return json_response(request, [
+        {"id": cid, "label": f"{created[:10]} – {desc or f'{kind} {cid}'}"}
+        for cid, desc, created in rows
+    ])
 
-    swing_clip_map = {}
-    for cid, hid, desc, fps, created in swing_rows:
-        hid = str(hid)
-        if hid not in swing_clip_map:
-            swing_clip_map[hid] = []
 
-        label = f"{created[:10]} – {desc or f'Swing {cid}'}"
-        swing_clip_map[hid].append({"id": cid, "label": label})
+@router.get("/matchup/select/pitchers")
+def select_pitchers(request: Request, team_id: int):
+    return players(request, "pitchers", team_id)
 
-    conn.close()
 
-    return templates.TemplateResponse(
-        "matchup_select.html",
-        {
-            "request": request,
-            "sid": sid,
-            "teams": teams,
+@router.get("/matchup/select/hitters")
+def select_hitters(request: Request, team_id: int):
+    return players(request, "hitters", team_id)
 
-            "pitcher_map": pitcher_map,
-            "pitch_clip_map": pitch_clip_map,
-            "hitter_map": hitter_map,
-            "swing_clip_map": swing_clip_map,
-        },
-    )
+
+@router.get("/matchup/select/pitch_clips")
+def select_pitch_clips(request: Request, pitcher_id: int):
+    return clips(request, "pitch_clips", "pitcher_id", pitcher_id, "Pitch")
+
+
+@router.get("/matchup/select/swing_clips")
+def select_swing_clips(request: Request, hitter_id: int):
+    return clips(request, "swing_clips", "hitter_id", hitter_id, "Swing")
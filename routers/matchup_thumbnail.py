@@ -1,25 +1,36 @@
-from fastapi import APIRouter
-from fastapi.responses import Response, HTMLResponse
+from fastapi import APIRouter, Request
+from fastapi.responses import HTMLResponse
 from utils.db import db
+from utils.store import exists, object_path
+from utils.streaming import stream_file
+from utils.thumbs import CACHE_CONTROL, DEFAULT_WIDTH, get_image, pick_width, variant_name
 
 router = APIRouter()
 
+
+# ------------------------------------------------------------
+# GET /thumbnail/matchup?id=&w=
+# Sized thumbnails are captured while the matchup renders; matchups
+# built before that only have the full-size matchups.thumb.
+# ------------------------------------------------------------
 @router.get("/thumbnail/matchup")
-def thumbnail_matchup(id: int):
+def thumbnail_matchup(request: Request, id: int, w: int = DEFAULT_WIDTH):
     conn = db()
-    row = conn.execute(
-        "SELECT thumb FROM matchups WHERE id=?",
+    img = get_image(conn, "matchup", id, variant_name(pick_width(w)))
+    row = None if img else conn.execute(
+        "SELECT thumb_sha FROM matchups WHERE id=?",
         (id,)
     ).fetchone()
     conn.close()
 
-    if not row or row[0] is None:
+    sha = img[0] if img else row and row[0]
+    if not sha or not exists(sha):
         return HTMLResponse("not found", status_code=404)
 
-    return Response(
-        content=row[0],
-        media_type="image/jpeg",
+    return stream_file(
+        request, object_path(sha), "image/jpeg", etag=sha,
         headers={
-            "Content-Disposition": f'inline; filename="thumb_{id}.jpg"'
+            "Cache-Control": CACHE_CONTROL,
+            "Content-Disposition": f'inline; filename="thumb_{id}.jpg"',
         }
     )
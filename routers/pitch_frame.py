@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Response
-import cv2
-import io
+from fastapi import APIRouter, Request, Response
 import os
 import tempfile
 
+from utils.filmstrip import load_index, sheet_path
+from utils.frame_server import get_frame_jpeg
+from utils.streaming import stream_file
+
 router = APIRouter()
 
 TEMP_DIR = tempfile.gettempdir()
@@ -19,13 +21,30 @@ def frame_pitch(id: str, frame: int):
     if not os.path.exists(path):
         return Response(content=b"missing temp file", status_code=404)
 
-    cap = cv2.VideoCapture(path)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
-    ret, img = cap.read()
-    cap.release()
+    jpg = get_frame_jpeg(id, path, frame)
 
-    if not ret:
+    if jpg is None:
         return Response(content=b"bad frame", status_code=404)
 
-    ok, jpeg = cv2.imencode(".jpg", img)
-    return Response(content=jpeg.tobytes(), media_type="image/jpeg")
+    # frame N of a temp upload never changes
+    return Response(
+        content=jpg,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+
+# ------------------------------------------------------------
+# GET /frame/pitch/strip  (filmstrip sprite sheet n)
+# ------------------------------------------------------------
+@router.get("/frame/pitch/strip")
+def strip_pitch(request: Request, id: str, sheet: int):
+
+    index = load_index(temp_path(id))
+    if not index or not 0 <= sheet < index["sheets"]:
+        return Response(content=b"missing filmstrip", status_code=404)
+
+    return stream_file(
+        request, sheet_path(temp_path(id), sheet), "image/jpeg",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
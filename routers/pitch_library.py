@@ -1,31 +1,24 @@
 from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, Response, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, Response, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from utils.db import db
-import re
-import cv2
-import tempfile
-import io
+from utils.fingerprint import delete_fingerprint
+from utils.paging import keyset_page, page_url
+from utils.store import exists, object_path
+from utils.streaming import stream_file
+from utils.thumbs import DEFAULT_WIDTH, clip_thumbnail, delete_images
 
 router = APIRouter()
 templates = Jinja2Templates("templates")
 
 # ------------------------------------------------------------
 # GET /library/pitch
+# First page of clips, newest first. Further pages come from
+# /library/pitch/rows as HTML fragments (infinite scroll); both
+# take the keyset cursor of the last row shown (utils/paging.py).
 # ------------------------------------------------------------
-@router.get("/library/pitch", response_class=HTMLResponse)
-def library_pitch(
-    request: Request,
-    sid: str = "x",
-    team_filter: str = "all",
-    pitcher_filter: str = "all"
-):
-    conn = db()
-
-    teams = conn.execute("SELECT id, name FROM teams ORDER BY name").fetchall()
-    pitchers = conn.execute("SELECT id, name FROM pitchers ORDER BY name").fetchall()
-
-    sql = "SELECT id, team_id, pitcher_id, description, fps, created_at FROM pitch_clips"
+def pitch_page(conn, sid, team_filter, pitcher_filter, cursor):
+    """Context for library_pitch_rows.html: one page plus the link to the next."""
     filters = []
     params = []
 
@@ -37,60 +30,73 @@ def library_pitch(
         filters.append("pitcher_id = ?")
         params.append(pitcher_filter)
 
-    if filters:
-        sql += " WHERE " + " AND ".join(filters)
+    clips, next_cursor = keyset_page(
+        conn,
+        "SELECT id, team_id, pitcher_id, description, fps, created_at FROM pitch_clips",
+        filters, params, cursor, key=lambda r: (r[5], r[0]),
+    )
+
+    query = {"sid": sid, "team_filter": team_filter, "pitcher_filter": pitcher_filter}
+    return {
+        "sid": sid,
+        "clips": clips,
+        "next_rows": next_cursor and page_url("/library/pitch/rows", next_cursor, **query),
+        "next_page": next_cursor and page_url("/library/pitch", next_cursor, **query),
+    }
+
+
+@router.get("/library/pitch", response_class=HTMLResponse)
+def library_pitch(
+    request: Request,
+    sid: str = "x",
+    team_filter: str = "all",
+    pitcher_filter: str = "all",
+    cursor: str = ""
+):
+    conn = db()
 
-    sql += " ORDER BY created_at DESC"
+    teams = conn.execute("SELECT id, name FROM teams ORDER BY name").fetchall()
+    pitchers = conn.execute("SELECT id, name FROM pitchers ORDER BY name").fetchall()
 
-    clips = conn.execute(sql, params).fetchall()
+    page = pitch_page(conn, sid, team_filter, pitcher_filter, cursor)
     conn.close()
 
     return templates.TemplateResponse(
         "library_pitch.html",
         {
             "request": request,
-            "sid": sid,
             "teams": teams,
             "pitchers": pitchers,
             "team_filter": team_filter,
             "pitcher_filter": pitcher_filter,
-            "clips": clips,
+            **page,
         },
     )
 
-# ------------------------------------------------------------
-# GET /thumbnail/pitch
-# ------------------------------------------------------------
-@router.get("/thumbnail/pitch")
-def thumbnail_pitch(id: int):
+
+@router.get("/library/pitch/rows", response_class=HTMLResponse)
+def library_pitch_rows(
+    request: Request,
+    sid: str = "x",
+    team_filter: str = "all",
+    pitcher_filter: str = "all",
+    cursor: str = ""
+):
     conn = db()
-    row = conn.execute("SELECT clip_blob FROM pitch_clips WHERE id=?", (id,)).fetchone()
+    page = pitch_page(conn, sid, team_filter, pitcher_filter, cursor)
     conn.close()
 
-    if not row:
-        return HTMLResponse("not found", status_code=404)
-
-    blob = row[0]
-
-    temp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    temp.write(blob)
-    temp.close()
-
-    cap = cv2.VideoCapture(temp.name)
-    ret, frame = cap.read()
-    cap.release()
-
-    try:
-        import os
-        os.remove(temp.name)
-    except:
-        pass
-
-    if not ret:
-        return HTMLResponse("bad frame", status_code=500)
+    return templates.TemplateResponse(
+        "library_pitch_rows.html", {"request": request, **page}
+    )
 
-    ok, jpg = cv2.imencode(".jpg", frame)
-    return StreamingResponse(io.BytesIO(jpg.tobytes()), media_type="image/jpeg")
+# ------------------------------------------------------------
+# GET /thumbnail/pitch
+# ------------------------------------------------------------
+@router.get("/thumbnail/pitch")
+def thumbnail_pitch(request: Request, id: int, w: int = DEFAULT_WIDTH):
+    # rendered once at finalize (or on first request for older clips)
+    return clip_thumbnail(request, "pitch", id, w)
 
 # ------------------------------------------------------------
 # GET /play/pitch
@@ -108,59 +114,14 @@ def play_pitch(request: Request, id: int, sid: str = "x"):
 @router.get("/stream/pitch")
 def stream_pitch(request: Request, id: int):
     conn = db()
-    row = conn.execute("SELECT clip_blob FROM pitch_clips WHERE id=?", (id,)).fetchone()
+    row = conn.execute("SELECT clip_sha FROM pitch_clips WHERE id=?", (id,)).fetchone()
     conn.close()
 
-    if not row:
+    if not row or not exists(row[0]):
         return HTMLResponse("not found", status_code=404)
 
-    blob = row[0]
-    size = len(blob)
-
-    range_header = request.headers.get("range")
-
-    if not range_header:
-        return Response(
-            content=blob,
-            status_code=200,
-            headers={
-                "Content-Type": "video/mp4",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(size),
-            },
-        )
-
-    match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-    if not match:
-        return Response(
-            content=blob,
-            status_code=200,
-            headers={
-                "Content-Type": "video/mp4",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(size),
-            },
-        )
-
-    start = int(match.group(1))
-    end = match.group(2)
-    end = size - 1 if end == "" else int(end)
-
-    if start >= size or start > end:
-        return Response(status_code=416)
-
-    chunk = blob[start : end + 1]
-
-    return Response(
-        content=chunk,
-        status_code=206,
-        headers={
-            "Content-Type": "video/mp4",
-            "Content-Range": f"bytes {start}-{end}/{size}",
-            "Content-Length": str(len(chunk)),
-            "Accept-Ranges": "bytes",
-        },
-    )
+    # bounded-memory range serving straight from the media store
+    return stream_file(request, object_path(row[0]), "video/mp4", etag=row[0])
 
 # ------------------------------------------------------------
 # POST /library/pitch/delete
@@ -169,6 +130,8 @@ def stream_pitch(request: Request, id: int):
 def delete_pitch_clip(id: int = Form(...), sid: str = Form("x")):
     conn = db()
     conn.execute("DELETE FROM pitch_clips WHERE id=?", (id,))
+    delete_fingerprint(conn, "pitch", id)
+    delete_images(conn, "pitch", id)
     conn.commit()
     conn.close()
     return RedirectResponse(f"/library/pitch?sid={sid}", status_code=303)
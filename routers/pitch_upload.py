@@ -1,7 +1,19 @@
-from fastapi import APIRouter, Request, Form, UploadFile, File
+from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from utils.db import db
+from utils.encoding import codec_args
+from utils.filmstrip import build_filmstrip, load_index, remove_filmstrip
+from utils.fingerprint import find_duplicates, save_fingerprint
+from utils.frame_server import finish_upload
+from utils.ingest import receive_upload, BadUpload, UploadTooLarge
+from utils.mp4index import build_index
+from utils.store import put_file
+from utils.thumbs import save_thumbs
+from utils.video import probe_video
+from utils.workspace import job_workspace
+import json
 import uuid
 import cv2
 import os
@@ -39,32 +51,50 @@ def upload_pitch_page(request: Request, sid: str = "x"):
 # POST /upload/pitch  (upload file)
 # -------------------------------------------------------
 @router.post("/upload/pitch")
-async def upload_pitch(
-    sid: str = Form("x"),
-    team_id: int = Form(...),
-    pitcher_id: int = Form(...),
-    description: str = Form(""),
-    file: UploadFile = File(...)
-):
+async def upload_pitch(request: Request):
     temp_id = str(uuid.uuid4())
     path = temp_path(temp_id)
 
-    with open(path, "wb") as f:
-        f.write(await file.read())
+    # form parsed as it streams in: the video goes straight to disk,
+    # hashed on the way, and an oversized upload is refused (413) by
+    # its Content-Length or as soon as it passes the cap
+    try:
+        form, size, source_sha = await receive_upload(request, path)
+    except UploadTooLarge as e:
+        return HTMLResponse(f"ERROR: {e}", status_code=413)
+    except BadUpload as e:
+        return HTMLResponse(f"ERROR: {e}", status_code=400)
+
+    sid = form.get("sid", "x")
+    description = form.get("description", "")
+    try:
+        team_id = int(form["team_id"])
+        pitcher_id = int(form["pitcher_id"])
+    except (KeyError, ValueError):
+        if size is not None:
+            os.remove(path)
+        return HTMLResponse("ERROR: missing team or pitcher", status_code=400)
+    if size is None:
+        return HTMLResponse("ERROR: no video file", status_code=400)
 
-    cap = cv2.VideoCapture(path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    cap.release()
+    # OpenCV calls block; keep them off the event loop
+    fps, total = await run_in_threadpool(probe_video, path)
 
     if fps == 0 or total == 0:
         if os.path.exists(path):
             os.remove(path)
         return HTMLResponse("ERROR: corrupted or invalid video", status_code=400)
 
+    # decode once into low-res sprite sheets for client-side scrubbing;
+    # the decoded count is exact, the container's frame count is not
+    strip = await run_in_threadpool(build_filmstrip, path)
+    if strip:
+        total = strip["total"]
+
     return RedirectResponse(
         f"/upload/pitch/trim?sid={sid}&temp_id={temp_id}&team_id={team_id}"
-        f"&pitcher_id={pitcher_id}&description={description}&fps={fps}&total={total}",
+        f"&pitcher_id={pitcher_id}&description={description}&fps={fps}&total={total}"
+        f"&source_sha={source_sha}",
         status_code=303,
     )
 
@@ -81,8 +111,18 @@ def pitch_trim_page(
     pitcher_id: int,
     description: str,
     fps: str,
-    total: int
+    total: int,
+    source_sha: str = ""
 ):
+    strip = load_index(temp_path(temp_id))
+
+    # surface likely duplicates before the encode step
+    conn = db()
+    duplicates = find_duplicates(
+        conn, "pitch", source_sha, strip.get("fingerprint") if strip else None
+    )
+    conn.close()
+
     return templates.TemplateResponse(
         "upload_pitch_trim.html",
         {
@@ -94,6 +134,9 @@ def pitch_trim_page(
             "description": description,
             "fps": fps,
             "total": total,
+            "source_sha": source_sha,
+            "strip": strip,
+            "duplicates": duplicates,
         },
     )
 
@@ -109,7 +152,8 @@ def finalize_pitch(
     pitcher_id: int = Form(...),
     description: str = Form(""),
     contact_frame: int = Form(...),
-    fps: float = Form(...)
+    fps: float = Form(...),
+    source_sha: str = Form("")
 ):
     path = temp_path(temp_id)
 
@@ -145,65 +189,85 @@ def finalize_pitch(
     # ------------------------------------------------------------
     # FRAME-PERFECT MP4 EXPORT (H.264 ALL-INTRA)
     # ------------------------------------------------------------
-    temp_raw = "pitch_raw.yuv"
-    temp_out = "pitch_out.mp4"
-
-    h, w, _ = frames[0].shape
-
-    with open(temp_raw, "wb") as f:
-        for fr in frames:
-            f.write(fr.tobytes())
-
-    exe = ffmpeg.get_ffmpeg_exe()
-
-    cmd = [
-        exe, "-y",
-        "-f", "rawvideo",
-        "-pix_fmt", "bgr24",
-        "-s", f"{w}x{h}",
-        "-r", str(fps),
-        "-i", temp_raw,
-
-        # H.264 ALL INTRA (every frame is a keyframe)
-        "-vcodec", "libx264",
-        "-preset", "fast",
-        "-crf", "17",
-        "-pix_fmt", "yuv420p",
-
-        # force I-frame only
-        "-g", "1",
-        "-keyint_min", "1",
-        "-sc_threshold", "0",
-        "-x264opts", "no-scenecut",
-
-        "-movflags", "+faststart",
-        temp_out,
-    ]
-
-    subprocess.run(cmd, check=True)
-
-    # read output
-    with open(temp_out, "rb") as f:
-        blob = f.read()
-
-    # cleanup
-    for p in [temp_raw, temp_out, path]:
-        if os.path.exists(p):
-            try:
-                os.remove(p)
-            except:
-                pass
+    # scratch files are private to this request and removed on exit
+    with job_workspace("pitch") as ws:
+        temp_raw = ws.path("pitch_raw.yuv")
+        temp_out = ws.path("pitch_out.mp4")
+
+        h, w, _ = frames[0].shape
+
+        with open(temp_raw, "wb") as f:
+            for fr in frames:
+                f.write(fr.tobytes())
+
+        exe = ffmpeg.get_ffmpeg_exe()
+
+        cmd = [
+            exe, "-y",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-s", f"{w}x{h}",
+            "-r", str(fps),
+            "-i", temp_raw,
+
+            # H.264 all-intra (every frame is a keyframe)
+            *codec_args("archival"),
+            temp_out,
+        ]
+
+        subprocess.run(cmd, check=True)
+
+        # move the encoded clip into the media store
+        clip_sha, clip_size = put_file(temp_out)
+
+        # per-frame byte ranges for single-sample frame fetches
+        sample_index = build_index(temp_out)
+
+    strip = load_index(path)
+
+    # the uploaded source is no longer needed
+    finish_upload(temp_id)
+    remove_filmstrip(path)
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except:
+            pass
 
     # ------------------------------------------------------------
     # STORE TO DB
     # ------------------------------------------------------------
     conn = db()
-    conn.execute(
-        "INSERT INTO pitch_clips (team_id, pitcher_id, description, clip_blob, fps, created_at) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        (team_id, pitcher_id, description, blob, fps, datetime.now())
+    cur = conn.execute(
+        "INSERT INTO pitch_clips (team_id, pitcher_id, description, clip_sha, clip_size, source_sha, sample_index, fps, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (team_id, pitcher_id, description, clip_sha, clip_size, source_sha or None,
+         json.dumps(sample_index) if sample_index else None, fps, datetime.now())
     )
+    if strip:
+        save_fingerprint(conn, "pitch", cur.lastrowid, strip.get("fingerprint"))
+    # thumbnails come from the first exported frame, already in memory
+    save_thumbs(conn, "pitch", cur.lastrowid, frames[0])
     conn.commit()
     conn.close()
 
     return RedirectResponse(f"/library/pitch?sid={sid}", status_code=303)
+
+
+# -------------------------------------------------------
+# POST /upload/pitch/discard
+# Drop an upload from the trim page (e.g. a duplicate) without encoding
+# -------------------------------------------------------
+@router.post("/upload/pitch/discard")
+def discard_pitch(sid: str = Form("x"), temp_id: str = Form(...)):
+    path = temp_path(temp_id)
+
+    finish_upload(temp_id)
+    remove_filmstrip(path)
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except:
+            pass
+
+    return RedirectResponse(f"/library/pitch?sid={sid}", status_code=303)
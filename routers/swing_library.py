@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, Response, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, Response, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from utils.db import db
-import re
-import cv2
-import tempfile
-import io
+from utils.fingerprint import delete_fingerprint
+from utils.paging import keyset_page, page_url
+from utils.store import exists, object_path
+from utils.streaming import stream_file
+from utils.thumbs import DEFAULT_WIDTH, clip_thumbnail, delete_images
 
 router = APIRouter()
 templates = Jinja2Templates("templates")
@@ -13,19 +14,45 @@ templates = Jinja2Templates("templates")
 
 # ------------------------------------------------------------
 # GET /library/swing
+# First page of clips, newest first; /library/swing/rows serves
+# the following pages as HTML fragments (see utils/paging.py).
 # ------------------------------------------------------------
+def swing_page(conn, sid, cursor):
+    """Context for library_swing_rows.html: one page plus the link to the next."""
+    clips, next_cursor = keyset_page(
+        conn,
+        "SELECT id, team_id, hitter_id, description, fps, created_at FROM swing_clips",
+        [], [], cursor, key=lambda r: (r[5], r[0]),
+    )
+
+    return {
+        "sid": sid,
+        "clips": clips,
+        "next_rows": next_cursor and page_url("/library/swing/rows", next_cursor, sid=sid),
+        "next_page": next_cursor and page_url("/library/swing", next_cursor, sid=sid),
+    }
+
+
 @router.get("/library/swing", response_class=HTMLResponse)
-def library_swing(request: Request, sid: str = "x"):
+def library_swing(request: Request, sid: str = "x", cursor: str = ""):
     conn = db()
-    clips = conn.execute(
-        "SELECT id, team_id, hitter_id, description, fps, created_at "
-        "FROM swing_clips ORDER BY created_at DESC"
-    ).fetchall()
+    page = swing_page(conn, sid, cursor)
     conn.close()
 
     return templates.TemplateResponse(
         "library_swing.html",
-        {"request": request, "sid": sid, "clips": clips},
+        {"request": request, **page},
+    )
+
+
+@router.get("/library/swing/rows", response_class=HTMLResponse)
+def library_swing_rows(request: Request, sid: str = "x", cursor: str = ""):
+    conn = db()
+    page = swing_page(conn, sid, cursor)
+    conn.close()
+
+    return templates.TemplateResponse(
+        "library_swing_rows.html", {"request": request, **page}
     )
 
 
@@ -36,6 +63,8 @@ def library_swing(request: Request, sid: str = "x"):
 def delete_swing_clip(id: int = Form(...), sid: str = Form("x")):
     conn = db()
     conn.execute("DELETE FROM swing_clips WHERE id=?", (id,))
+    delete_fingerprint(conn, "swing", id)
+    delete_images(conn, "swing", id)
     conn.commit()
     conn.close()
 
@@ -46,36 +75,9 @@ def delete_swing_clip(id: int = Form(...), sid: str = Form("x")):
 # GET /thumbnail/swing
 # ------------------------------------------------------------
 @router.get("/thumbnail/swing")
-def thumbnail_swing(id: int):
-    conn = db()
-    row = conn.execute("SELECT clip_blob FROM swing_clips WHERE id=?", (id,)).fetchone()
-    conn.close()
-
-    if not row:
-        return HTMLResponse("not found", status_code=404)
-
-    blob = row[0]
-
-    temp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    temp.write(blob)
-    temp.close()
-
-    cap = cv2.VideoCapture(temp.name)
-    ret, frame = cap.read()
-    cap.release()
-
-    try:
-        import os
-        os.remove(temp.name)
-    except:
-        pass
-
-    if not ret:
-        return HTMLResponse("bad frame", status_code=500)
-
-    ok, jpg = cv2.imencode(".jpg", frame)
-    return StreamingResponse(io.BytesIO(jpg.tobytes()), media_type="image/jpeg")
-
+def thumbnail_swing(request: Request, id: int, w: int = DEFAULT_WIDTH):
+    # rendered once at finalize (or on first request for older clips)
+    return clip_thumbnail(request, "swing", id, w)
 
 # ------------------------------------------------------------
 # GET /play/swing
@@ -94,57 +96,11 @@ def play_swing(request: Request, id: int, sid: str = "x"):
 @router.get("/stream/swing")
 def stream_swing(request: Request, id: int):
     conn = db()
-    row = conn.execute("SELECT clip_blob FROM swing_clips WHERE id=?", (id,)).fetchone()
+    row = conn.execute("SELECT clip_sha FROM swing_clips WHERE id=?", (id,)).fetchone()
     conn.close()
 
-    if not row:
+    if not row or not exists(row[0]):
         return HTMLResponse("not found", status_code=404)
 
-    blob = row[0]
-    size = len(blob)
-
-    range_header = request.headers.get("range")
-
-    # No range → serve entire file
-    if not range_header:
-        return Response(
-            content=blob,
-            status_code=200,
-            headers={
-                "Content-Type": "video/mp4",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(size),
-            },
-        )
-
-    match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-    if not match:
-        return Response(
-            content=blob,
-            status_code=200,
-            headers={
-                "Content-Type": "video/mp4",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(size),
-            },
-        )
-
-    start = int(match.group(1))
-    end = match.group(2)
-    end = size - 1 if end == "" else int(end)
-
-    if start >= size or start > end:
-        return Response(status_code=416)
-
-    chunk = blob[start : end + 1]
-
-    return Response(
-        content=chunk,
-        status_code=206,
-        headers={
-            "Content-Type": "video/mp4",
-            "Content-Range": f"bytes {start}-{end}/{size}",
-            "Content-Length": str(len(chunk)),
-            "Accept-Ranges": "bytes",
-        },
-    )
+    # bounded-memory range serving straight from the media store
+    return stream_file(request, object_path(row[0]), "video/mp4", etag=row[0])
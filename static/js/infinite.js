@@ -0,0 +1,38 @@
+// Infinite scroll for the library pages.
+// Each page of rows ends with <a class="load-more" data-src="...">:
+// when it comes near the viewport the next page's rows are fetched
+// as an HTML fragment and put in its place (ending in the next
+// sentinel, if any). Without js the sentinel is a plain link.
+
+const observer = new IntersectionObserver(entries => {
+    entries.forEach(e => {
+        if (e.isIntersecting) loadMore(e.target);
+    });
+}, { rootMargin: "600px 0px" });
+
+async function loadMore(sentinel) {
+    observer.unobserve(sentinel);
+    sentinel.textContent = "Loading...";
+
+    try {
+        const res = await fetch(sentinel.dataset.src);
+        if (!res.ok) throw new Error(res.status);
+        const html = await res.text();
+
+        const parent = sentinel.parentNode;
+        sentinel.insertAdjacentHTML("beforebegin", html);
+        sentinel.remove();
+        parent.querySelectorAll("a.load-more").forEach(watch);
+    } catch (err) {
+        // leave the plain link to click
+        sentinel.textContent = "Load more";
+    }
+}
+
+function watch(sentinel) {
+    if (sentinel.dataset.watched) return;
+    sentinel.dataset.watched = "1";
+    observer.observe(sentinel);
+}
+
+document.querySelectorAll("a.load-more").forEach(watch);
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+from routers.matchup_library import matchup_page
+from routers.pitch_library import pitch_page
+from routers.swing_library import swing_page
+from utils import summary
+from utils.migrations import migrate
+from utils.paging import encode_cursor
+
+# ------------------------------------------------------------
+# LIBRARY / SELECTOR / SUMMARY QUERIES USE THEIR INDEXES
+# The library pages run the routers' own page functions and check
+# every statement they execute; the selector lookups and summary
+# writes are the statements of routers/matchup_select.py and
+# utils/summary.py. Each plan must go through the expected index
+# and never scan a table or sort it in a temp b-tree: those pages
+# must cost O(page), not O(table).
+# ------------------------------------------------------------
+CURSOR = encode_cursor("2025-01-01 00:00:00", 1 << 30)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def plan(conn, sql, params=()):
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def executed(conn, page, *args):
+    """SQL (values inlined) of every statement page(conn, ...) runs."""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        page(conn, *args)
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def check(details, index):
+    assert any(f"INDEX {index} " in d or d.endswith(f"INDEX {index}") for d in details), details
+    for d in details:
+        words = d.split()
+        assert not (words[0] == "SCAN" and "USING" not in words), details
+        assert "TEMP B-TREE" not in d, details
+
+
+PAGES = [
+    # (page function, arguments after conn, expected index)
+    (pitch_page, ("x", "all", "all", ""), "idx_pitch_clips_created"),
+    (pitch_page, ("x", "all", "all", CURSOR), "idx_pitch_clips_created"),
+    (pitch_page, ("x", "1", "all", CURSOR), "idx_pitch_clips_team"),
+    (pitch_page, ("x", "all", "1", CURSOR), "idx_pitch_clips_pitcher"),
+    (pitch_page, ("x", "1", "1", CURSOR), "idx_pitch_clips_team"),
+    (swing_page, ("x", ""), "idx_swing_clips_created"),
+    (swing_page, ("x", CURSOR), "idx_swing_clips_created"),
+    (matchup_page, ("x", "all", "all", "all", "all", "", ""), "idx_matchup_summary_created"),
+    (matchup_page, ("x", "all", "all", "all", "all", "", CURSOR), "idx_matchup_summary_created"),
+    (matchup_page, ("x", "all", "all", "all", "all", "bunt", CURSOR), "idx_matchup_summary_created"),
+    (matchup_page, ("x", "1", "all", "all", "all", "", CURSOR), "idx_matchup_summary_pitcher_team"),
+    (matchup_page, ("x", "1", "2", "all", "all", "", CURSOR), "idx_matchup_summary_pitcher"),
+    (matchup_page, ("x", "all", "all", "1", "all", "", CURSOR), "idx_matchup_summary_hitter_team"),
+    (matchup_page, ("x", "all", "all", "1", "2", "", CURSOR), "idx_matchup_summary_hitter"),
+]
+
+
+@pytest.mark.parametrize("page, args, index", PAGES)
+def test_library_page(conn, page, args, index):
+    statements = executed(conn, page, *args)
+    assert statements
+    for sql in statements:
+        check(plan(conn, sql), index)
+
+
+SELECTOR = [
+    ("SELECT id, name FROM pitchers WHERE team_id=? ORDER BY name", "idx_pitchers_team"),
+    ("SELECT id, name FROM hitters WHERE team_id=? ORDER BY name", "idx_hitters_team"),
+    ("SELECT id, description, created_at FROM pitch_clips "
+     "WHERE pitcher_id=? ORDER BY created_at DESC", "idx_pitch_clips_pitcher"),
+    ("SELECT id, description, created_at FROM swing_clips "
+     "WHERE hitter_id=? ORDER BY created_at DESC", "idx_swing_clips_hitter"),
+]
+
+
+@pytest.mark.parametrize("sql, index", SELECTOR)
+def test_selector_lookup(conn, sql, index):
+    check(plan(conn, sql, (1,)), index)
+
+
+def test_summary_refresh_is_keyed(conn):
+    details = plan(conn, summary.REFRESH + " WHERE m.id = ?", (1,))
+    assert len(details) == 8, details
+    for d in details:
+        assert d.startswith("SEARCH ") and "PRIMARY KEY" in d, details
+
+
+def test_summary_delete_is_keyed(conn):
+    details = plan(conn, "DELETE FROM matchup_summary WHERE matchup_id=?", (1,))
+    assert details == ["SEARCH matchup_summary USING INTEGER PRIMARY KEY (rowid=?)"]
@@ -1,7 +1,140 @@
+import os
 import sqlite3
+import threading
+
+from utils.migrations import migrate
 
 DB_PATH = "app.db"
 
+# ------------------------------------------------------------
+# POOLED SQLITE CONNECTIONS
+#   GF_DB_POOL       idle connections kept per process (default 8)
+#   GF_DB_BUSY_MS    how long a writer waits for the write lock
+#                    before "database is locked" (default 5000)
+#   GF_DB_MMAP_MB    bytes of the file read through mmap (default 256)
+#   GF_DB_CACHE_MB   page cache per connection (default 16)
+#
+# The database runs in WAL mode: readers see the last committed
+# state and never wait for a writer (or a writer for them), so a
+# finalize or render insert does not stall library pages. Only
+# writers queue, for at most the busy timeout. synchronous=NORMAL
+# is durable across application crashes in WAL mode and only an
+# OS crash / power loss can drop the last commits.
+#
+# db() hands out a connection from the pool; close() returns it
+# (rolling back anything left uncommitted) instead of closing it.
+# A pooled connection keeps its prepared-statement cache, so the
+# same query text is compiled once per connection, not per request.
+# Beyond GF_DB_POOL idle connections, released ones are closed.
+#
+# The first connection a process opens to a database file applies
+# any pending schema migrations (utils/migrations.py).
+# ------------------------------------------------------------
+POOL_SIZE = int(os.environ.get("GF_DB_POOL", "8"))
+BUSY_TIMEOUT_MS = int(os.environ.get("GF_DB_BUSY_MS", "5000"))
+MMAP_BYTES = int(os.environ.get("GF_DB_MMAP_MB", "256")) * 1024 * 1024
+CACHE_KB = int(os.environ.get("GF_DB_CACHE_MB", "16")) * 1024
+
+# prepared statements kept per connection
+STATEMENT_CACHE = 256
+
+POOL = {}
+POOL_PID = [os.getpid()]
+POOL_LOCK = threading.Lock()
+
+# database files this process has brought up to date
+MIGRATED = set()
+MIGRATE_LOCK = threading.Lock()
+
+
+def connect(path=None):
+    """A new, unpooled connection with the standard pragmas."""
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        check_same_thread=False,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_KB}")
+    return conn
+
+
+class PooledConnection:
+    """
+    Wraps a sqlite3 connection; everything but close() is passed
+    through. close() is safe to call more than once.
+    """
+
+    def __init__(self, conn, path):
+        self.conn = conn
+        self.path = path
+
+    def __getattr__(self, name):
+        if self.conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+    def close(self):
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            release(conn, self.path)
+
+
+def release(conn, path):
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        conn.close()
+        return
+
+    with POOL_LOCK:
+        idle = POOL.setdefault(path, [])
+        if POOL_PID[0] == os.getpid() and len(idle) < POOL_SIZE:
+            idle.append(conn)
+            return
+
+    conn.close()
+
+
 def db():
-    """Return a new SQLite connection."""
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    """Return a pooled SQLite connection; close() gives it back."""
+    path = DB_PATH
+
+    with POOL_LOCK:
+        # connections must not cross a fork
+        if POOL_PID[0] != os.getpid():
+            POOL.clear()
+            POOL_PID[0] = os.getpid()
+
+        idle = POOL.get(path)
+        conn = idle.pop() if idle else None
+
+    if conn is None:
+        conn = connect(path)
+        if path not in MIGRATED:
+            with MIGRATE_LOCK:
+                if path not in MIGRATED:
+                    migrate(conn)
+                    MIGRATED.add(path)
+
+    return PooledConnection(conn, path)
+
+
+def close_pool():
+    """Close every idle connection (tests, shutdown)."""
+    with POOL_LOCK:
+        for idle in POOL.values():
+            for conn in idle:
+                conn.close()
+        POOL.clear()
@@ -0,0 +1,132 @@
+import logging
+import os
+import re
+
+# ------------------------------------------------------------
+# ENCODING PROFILES
+# Every libx264 encode picks one of these by name:
+#
+#   archival  stored pitch / swing clips. All-intra (gop 1): every
+#             frame is a keyframe, so trim pages scrub exactly and
+#             utils/mp4index can decode single samples. A larger
+#             gop saves storage but sends frame fetches back to
+#             slow seeks.
+#   preview   rendered matchups played from the library
+#   share     downloads / files handed to other tools
+#   mobile    low-bitrate playback on phones and stadium Wi-Fi
+#
+# Each field can be overridden per deployment with
+#   GF_ENC_<PROFILE>_<FIELD>   e.g. GF_ENC_ARCHIVAL_CRF=20.5
+# (a value that does not parse is logged and the default kept)
+# and per call with codec_args(name, crf=..., threads=...).
+#
+#   preset    x264 speed/size trade-off (ultrafast ... veryslow)
+#   crf       constant quality, lower = better / bigger
+#   gop       max frames between keyframes (1 = all-intra)
+#   threads   x264 threads, 0 = auto
+#   maxrate   optional VBV cap, e.g. "1500k"
+#   bufsize   VBV buffer for maxrate, e.g. "3000k"
+#   x264opts  extra x264 options
+# ------------------------------------------------------------
+PROFILES = {
+    "archival": {"preset": "fast", "crf": 17, "gop": 1, "threads": 0, "maxrate": "", "bufsize": "", "x264opts": ""},
+    "preview": {"preset": "veryfast", "crf": 23, "gop": 250, "threads": 0, "maxrate": "", "bufsize": "", "x264opts": "no-dct-decimate=1"},
+    "share": {"preset": "medium", "crf": 20, "gop": 250, "threads": 0, "maxrate": "", "bufsize": "", "x264opts": ""},
+    "mobile": {"preset": "veryfast", "crf": 26, "gop": 60, "threads": 0, "maxrate": "1500k", "bufsize": "3000k", "x264opts": ""},
+}
+
+
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast",
+           "medium", "slow", "slower", "veryslow", "placebo")
+
+log = logging.getLogger(__name__)
+
+
+def parse_crf(value):
+    crf = float(value)
+    if not 0 <= crf <= 51:
+        raise ValueError("crf must be between 0 and 51")
+    return int(crf) if crf.is_integer() else crf
+
+
+def parse_count(minimum):
+    def parse(value):
+        n = int(value)
+        if n < minimum:
+            raise ValueError(f"must be at least {minimum}")
+        return n
+    return parse
+
+
+def parse_preset(value):
+    if value not in PRESETS:
+        raise ValueError(f"preset must be one of {', '.join(PRESETS)}")
+    return value
+
+
+def parse_rate(value):
+    # "" turns the cap off
+    if value and not re.fullmatch(r"\d+(\.\d+)?[kKmM]?", value):
+        raise ValueError('rate must look like "1500k"')
+    return value
+
+
+FIELDS = {
+    "preset": parse_preset,
+    "crf": parse_crf,
+    "gop": parse_count(1),
+    "threads": parse_count(0),
+    "maxrate": parse_rate,
+    "bufsize": parse_rate,
+    "x264opts": str,
+}
+
+
+def load_overrides():
+    for name, settings in PROFILES.items():
+        for field in settings:
+            var = f"GF_ENC_{name.upper()}_{field.upper()}"
+            value = os.environ.get(var)
+            if value is None:
+                continue
+            try:
+                settings[field] = FIELDS[field](value.strip())
+            except ValueError as e:
+                log.warning("ignoring %s=%r (%s), keeping %r", var, value, e, settings[field])
+
+
+load_overrides()
+
+
+def profile(name, **overrides):
+    """The named profile's settings, with per-call overrides applied."""
+    if name not in PROFILES:
+        raise ValueError(f"unknown encoding profile: {name}")
+    return {**PROFILES[name], **overrides}
+
+
+def codec_args(name, **overrides):
+    """ffmpeg output options for an H.264 / yuv420p mp4 in the named profile."""
+    p = profile(name, **overrides)
+
+    args = [
+        "-vcodec", "libx264",
+        "-pix_fmt", "yuv420p",
+        "-preset", p["preset"],
+        "-crf", str(p["crf"]),
+        "-g", str(p["gop"]),
+    ]
+
+    x264opts = [p["x264opts"]] if p["x264opts"] else []
+    if p["gop"] == 1:
+        # force I-frame only
+        args += ["-keyint_min", "1", "-sc_threshold", "0"]
+        x264opts.append("no-scenecut")
+    if x264opts:
+        args += ["-x264opts", ":".join(x264opts)]
+
+    if p["maxrate"]:
+        args += ["-maxrate", p["maxrate"], "-bufsize", p["bufsize"] or p["maxrate"]]
+
+    args += ["-threads", str(p["threads"]), "-movflags", "+faststart"]
+    return args
@@ -0,0 +1,125 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from utils.fingerprint import dhash, sample
+
+# ------------------------------------------------------------
+# UPLOAD FILMSTRIP
+# Decodes an uploaded clip once and writes low-res frames tiled
+# into JPEG sprite sheets next to the temp file:
+#
+#   gf_<id>.mp4              the upload
+#   gf_<id>_strip.json       index (tile size, grid, sheet count)
+#   gf_<id>_strip_<n>.jpg    sheet n, frames n*PER_SHEET ...
+#
+# The trim pages scrub through the sheets in the browser and only
+# ask the server for full-resolution frames when a marker is set.
+# The same pass hashes each tile for the duplicate fingerprint
+# (utils/fingerprint.py), stored in the index.
+# ------------------------------------------------------------
+TILE_W = 160
+COLS = 10
+ROWS = 10
+PER_SHEET = COLS * ROWS
+JPEG_QUALITY = 70
+
+
+def strip_base(video_path):
+    return os.path.splitext(video_path)[0] + "_strip"
+
+
+def index_path(video_path):
+    return strip_base(video_path) + ".json"
+
+
+def sheet_path(video_path, n):
+    return f"{strip_base(video_path)}_{n}.jpg"
+
+
+def build_filmstrip(video_path):
+    """Decode every frame once and write the sprite sheets. Returns the index."""
+    cap = cv2.VideoCapture(video_path)
+
+    sheet = None
+    tile_h = 0
+    total = 0
+    sheets = 0
+    hashes = []
+
+    def flush():
+        ok, jpg = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if ok:
+            with open(sheet_path(video_path, sheets), "wb") as f:
+                f.write(jpg.tobytes())
+
+    while True:
+        ret, fr = cap.read()
+        if not ret:
+            break
+
+        if sheet is None:
+            h, w = fr.shape[:2]
+            tile_h = max(1, int(round(h * TILE_W / w)))
+            sheet = np.zeros((ROWS * tile_h, COLS * TILE_W, 3), dtype=np.uint8)
+
+        slot = total % PER_SHEET
+        y = (slot // COLS) * tile_h
+        x = (slot % COLS) * TILE_W
+        tile = sheet[y:y + tile_h, x:x + TILE_W]
+        tile[:] = cv2.resize(fr, (TILE_W, tile_h), interpolation=cv2.INTER_AREA)
+        hashes.append(dhash(tile))
+        total += 1
+
+        if slot == PER_SHEET - 1:
+            flush()
+            sheets += 1
+            sheet[:] = 0
+
+    cap.release()
+
+    if total == 0:
+        return None
+
+    if total % PER_SHEET:
+        flush()
+        sheets += 1
+
+    index = {
+        "tile_w": TILE_W,
+        "tile_h": tile_h,
+        "cols": COLS,
+        "rows": ROWS,
+        "per_sheet": PER_SHEET,
+        "sheets": sheets,
+        "total": total,
+        "fingerprint": sample(hashes),
+    }
+
+    with open(index_path(video_path), "w") as f:
+        json.dump(index, f)
+
+    return index
+
+
+def load_index(video_path):
+    try:
+        with open(index_path(video_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_filmstrip(video_path):
+    index = load_index(video_path)
+    paths = [index_path(video_path)]
+    if index:
+        paths += [sheet_path(video_path, n) for n in range(index["sheets"])]
+
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
@@ -0,0 +1,113 @@
+import os
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+# ------------------------------------------------------------
+# DUPLICATE-UPLOAD DETECTION
+# Two signals, both known before the trim/encode step:
+#
+#   source_sha   SHA-256 of the uploaded file (utils/ingest.py);
+#                equal hash = byte-identical upload
+#   fingerprint  64-bit dHash of SAMPLES frames spread evenly over
+#                the clip; survives re-encodes, rescales and
+#                recompression of the same broadcast footage
+#
+# Per-frame hashes are taken from the filmstrip tiles, so the
+# fingerprint costs no extra decode. Finalized clips are indexed in
+# clip_fingerprints.
+#
+#   GF_DUP_MAX_BITS   mean differing bits per sampled frame still
+#                     treated as the same footage (default 6 of 64)
+# ------------------------------------------------------------
+SAMPLES = 16
+MAX_BITS = float(os.environ.get("GF_DUP_MAX_BITS", "6"))
+
+TABLES = {"pitch": "pitch_clips", "swing": "swing_clips"}
+
+
+def dhash(img):
+    """64-bit difference hash: brighter-than-right-neighbour on a 9x8 grey grid."""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def sample(hashes, n=SAMPLES):
+    """Pick n per-frame hashes at evenly spaced positions, as hex strings."""
+    if not hashes:
+        return []
+    count = len(hashes)
+    n = min(n, count)
+    picks = [hashes[(i * count) // n] for i in range(n)]
+    return [f"{h:016x}" for h in picks]
+
+
+def distance(a, b):
+    """Mean Hamming distance per sampled frame; None if not comparable."""
+    if not a or len(a) != len(b):
+        return None
+    bits = sum(bin(int(x, 16) ^ int(y, 16)).count("1") for x, y in zip(a, b))
+    return bits / len(a)
+
+
+# ------------------------------------------------------------
+# INDEX
+# ------------------------------------------------------------
+def find_duplicates(conn, kind, source_sha, fingerprint):
+    """
+    Existing clips of `kind` that look like this upload, closest first:
+    [{"id", "description", "created_at", "exact", "similarity"}]
+    """
+    table = TABLES[kind]
+    found = {}
+
+    if source_sha:
+        for r in conn.execute(
+            f"SELECT id, description, created_at FROM {table} WHERE source_sha=?",
+            (source_sha,)
+        ).fetchall():
+            found[r[0]] = {
+                "id": r[0], "description": r[1], "created_at": r[2],
+                "exact": True, "similarity": 1.0,
+            }
+
+    if fingerprint:
+        rows = conn.execute(
+            f"SELECT f.clip_id, f.hashes, c.description, c.created_at "
+            f"FROM clip_fingerprints f JOIN {table} c ON c.id = f.clip_id "
+            f"WHERE f.kind=? AND f.samples=?",
+            (kind, len(fingerprint))
+        ).fetchall()
+
+        for clip_id, hashes, desc, created in rows:
+            if clip_id in found:
+                continue
+            d = distance(fingerprint, hashes.split())
+            if d is not None and d <= MAX_BITS:
+                found[clip_id] = {
+                    "id": clip_id, "description": desc, "created_at": created,
+                    "exact": False, "similarity": round(1 - d / 64, 3),
+                }
+
+    return sorted(found.values(), key=lambda m: -m["similarity"])
+
+
+def save_fingerprint(conn, kind, clip_id, fingerprint):
+    """Index a finalized clip (caller commits)."""
+    if not fingerprint:
+        return
+    conn.execute(
+        "INSERT INTO clip_fingerprints (kind, clip_id, samples, hashes, created_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (kind, clip_id, len(fingerprint), " ".join(fingerprint), datetime.now())
+    )
+
+
+def delete_fingerprint(conn, kind, clip_id):
+    conn.execute(
+        "DELETE FROM clip_fingerprints WHERE kind=? AND clip_id=?", (kind, clip_id)
+    )
@@ -0,0 +1,125 @@
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from utils.video import letterbox, probe_video
+
+# ------------------------------------------------------------
+# DECODED FRAME CACHE
+# Matchup builds need every frame of a pitch / swing clip decoded
+# and letterboxed to the half-frame size. A pitch is paired with
+# many hitters, so the decoded stack is kept on disk as
+#
+#   <GF_FRAME_CACHE_DIR>/<clip sha>_<w>x<h>.npy    (N, h, w, 3) uint8
+#
+# and memory-mapped read-only by later builds: no decode, no resize,
+# and pages are shared between concurrent render processes.
+# Keyed by the clip's content sha so a cached stack can never go
+# stale. Least recently used stacks are evicted once the directory
+# exceeds GF_FRAME_CACHE_MB.
+#
+#   GF_FRAME_CACHE_DIR   cache location (default "frame_cache")
+#   GF_FRAME_CACHE_MB    size cap (default 4096)
+# ------------------------------------------------------------
+CACHE_DIR = os.environ.get("GF_FRAME_CACHE_DIR", "frame_cache")
+CACHE_BYTES = int(os.environ.get("GF_FRAME_CACHE_MB", "4096")) * 1024 * 1024
+
+
+def cache_path(sha, w, h):
+    return os.path.join(CACHE_DIR, f"{sha}_{w}x{h}.npy")
+
+
+def decode_stack(video_path, dest, w, h):
+    """Decode + letterbox every frame straight into a new .npy memmap."""
+    count = max(1, probe_video(video_path)[1])
+
+    fd, tmp = tempfile.mkstemp(prefix=".incoming_", suffix=".npy", dir=CACHE_DIR)
+    os.close(fd)
+
+    try:
+        stack = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.uint8, shape=(count, h, w, 3)
+        )
+
+        extra = []
+        n = 0
+        cap = cv2.VideoCapture(video_path)
+        while True:
+            ret, fr = cap.read()
+            if not ret:
+                break
+            if n < count:
+                letterbox(fr, w, h, out=stack[n])
+            else:
+                extra.append(letterbox(fr, w, h))
+            n += 1
+        cap.release()
+
+        if n == 0:
+            raise ValueError(f"no frames decoded from {video_path}")
+
+        if n != count:
+            # the container's frame count was wrong; rewrite at the
+            # decoded length (rare)
+            fixed = np.concatenate([stack[:n]] + ([np.stack(extra)] if extra else []))
+            del stack
+            np.save(tmp, fixed)
+        else:
+            stack.flush()
+            del stack
+
+        os.replace(tmp, dest)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def evict(keep):
+    """Drop least recently used stacks until the cache fits CACHE_BYTES."""
+    entries = []
+    total = 0
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".npy") or name.startswith(".incoming_"):
+            continue
+        p = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+        total += st.st_size
+
+    for mtime, size, p in sorted(entries):
+        if total <= CACHE_BYTES:
+            break
+        if p == keep:
+            continue
+        try:
+            # processes that already mapped it keep their pages
+            os.remove(p)
+            total -= size
+        except OSError:
+            pass
+
+
+def frame_stack(video_path, sha, w=640, h=720):
+    """
+    Letterboxed frames of a stored clip as a read-only (N, h, w, 3)
+    array, decoding and caching them on first use.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(sha, w, h)
+
+    try:
+        # mtime doubles as the LRU timestamp
+        os.utime(path)
+        return np.load(path, mmap_mode="r")
+    except FileNotFoundError:
+        pass
+
+    decode_stack(video_path, path, w, h)
+    evict(path)
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# ------------------------------------------------------------
+# TRIM PREVIEW FRAME SERVER
+# One open decoder per uploaded temp file plus a shared LRU of
+# downscaled preview JPEGs. Scrubbing hits the cache or decodes
+# sequentially from the decoder's current position instead of
+# opening the file and seeking from the previous keyframe on
+# every slider movement.
+#
+#   GF_PREVIEW_WIDTH      preview JPEG width in px (default 640)
+#   GF_PREVIEW_CACHE_MB   total JPEG cache across uploads (default 64)
+#   GF_PREVIEW_IDLE_SEC   close decoders unused this long (default 300);
+#                         a background thread checks every IDLE_SEC / 5
+#   GF_PREVIEW_PREFETCH   frames decoded ahead after a request (default 12)
+# ------------------------------------------------------------
+PREVIEW_WIDTH = int(os.environ.get("GF_PREVIEW_WIDTH", "640"))
+CACHE_BYTES = int(os.environ.get("GF_PREVIEW_CACHE_MB", "64")) * 1024 * 1024
+IDLE_SEC = int(os.environ.get("GF_PREVIEW_IDLE_SEC", "300"))
+PREFETCH = int(os.environ.get("GF_PREVIEW_PREFETCH", "12"))
+
+JPEG_QUALITY = 85
+
+
+class FrameServer:
+    """An open decoder on one temp upload."""
+
+    def __init__(self, path):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.total = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.next_index = 0
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        # bumped by every request so read-ahead stops when the user moves
+        self.generation = 0
+
+    def decode(self, index):
+        """Decode one frame; sequential reads skip the seek entirely."""
+        if index != self.next_index:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+        ret, img = self.cap.read()
+        self.next_index = index + 1 if ret else -1
+        return img if ret else None
+
+    def close(self):
+        self.generation += 1
+        with self.lock:
+            self.cap.release()
+
+
+SERVERS = {}
+CACHE = OrderedDict()          # (temp_id, frame) -> jpeg bytes
+CACHE_SIZE = [0]
+STATE_LOCK = threading.Lock()
+SWEEPER = []                   # the idle sweeper thread, once started
+
+PREFETCHER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gf_prefetch")
+
+
+def encode_preview(img):
+    h, w = img.shape[:2]
+    if w > PREVIEW_WIDTH:
+        img = cv2.resize(
+            img, (PREVIEW_WIDTH, int(h * PREVIEW_WIDTH / w)),
+            interpolation=cv2.INTER_AREA
+        )
+    ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return jpg.tobytes() if ok else None
+
+
+def cache_get(key):
+    with STATE_LOCK:
+        jpg = CACHE.get(key)
+        if jpg is not None:
+            CACHE.move_to_end(key)
+        return jpg
+
+
+def cache_put(key, jpg):
+    with STATE_LOCK:
+        if key in CACHE:
+            return
+        CACHE[key] = jpg
+        CACHE_SIZE[0] += len(jpg)
+
+        while CACHE_SIZE[0] > CACHE_BYTES and CACHE:
+            _, old = CACHE.popitem(last=False)
+            CACHE_SIZE[0] -= len(old)
+
+
+def sweep_idle():
+    """Tear down decoders (and their cached frames) nobody used recently."""
+    cutoff = time.time() - IDLE_SEC
+    with STATE_LOCK:
+        idle = [tid for tid, s in SERVERS.items() if s.last_used < cutoff]
+    for temp_id in idle:
+        close_server(temp_id)
+
+
+def sweeper():
+    """
+    Sweep on a timer: an abandoned trim page (no finalize / discard,
+    no further frame requests) must not keep its decoder open.
+    """
+    while True:
+        time.sleep(max(1, IDLE_SEC / 5))
+        try:
+            sweep_idle()
+        except Exception:
+            traceback.print_exc()
+
+
+def get_server(temp_id, path):
+    with STATE_LOCK:
+        server = SERVERS.get(temp_id)
+        if server is not None:
+            server.last_used = time.time()
+            return server
+
+        if not SWEEPER:
+            SWEEPER.append(threading.Thread(target=sweeper, daemon=True, name="gf_preview_sweep"))
+            SWEEPER[0].start()
+
+    # opening the file probes the container; other uploads' requests
+    # must not wait on it
+    opened = FrameServer(path)
+
+    with STATE_LOCK:
+        server = SERVERS.setdefault(temp_id, opened)
+        server.last_used = time.time()
+
+    if server is not opened:
+        # a concurrent request opened it first
+        opened.close()
+    return server
+
+
+def prefetch(temp_id, server, start, generation):
+    """Decode frames after `start` while the decoder is already positioned."""
+    with server.lock:
+        for index in range(start, min(start + PREFETCH, server.total)):
+            if server.generation != generation:
+                return
+            if cache_get((temp_id, index)) is not None:
+                continue
+            img = server.decode(index)
+            if img is None:
+                return
+            jpg = encode_preview(img)
+            if jpg:
+                cache_put((temp_id, index), jpg)
+
+
+def get_frame_jpeg(temp_id, path, index):
+    """Preview JPEG for one frame of an uploaded temp clip, or None."""
+    server = get_server(temp_id, path)
+    server.generation += 1
+    generation = server.generation
+
+    jpg = cache_get((temp_id, index))
+
+    if jpg is None:
+        with server.lock:
+            # read-ahead may have produced it while we waited
+            jpg = cache_get((temp_id, index))
+            img = None if jpg else server.decode(index)
+
+        if jpg is None:
+            if img is None:
+                return None
+            jpg = encode_preview(img)
+            if jpg is None:
+                return None
+            cache_put((temp_id, index), jpg)
+
+    PREFETCHER.submit(prefetch, temp_id, server, index + 1, generation)
+    return jpg
+
+
+def close_server(temp_id):
+    """Release the decoder and drop cached frames for one upload."""
+    with STATE_LOCK:
+        server = SERVERS.pop(temp_id, None)
+        for key in [k for k in CACHE if k[0] == temp_id]:
+            CACHE_SIZE[0] -= len(CACHE.pop(key))
+
+    if server:
+        server.close()
+
+
+def finish_upload(temp_id):
+    """Finalize / discard: close this upload's decoder and any idle ones."""
+    close_server(temp_id)
+    sweep_idle()
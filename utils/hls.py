@@ -0,0 +1,183 @@
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import imageio_ffmpeg as ffmpeg
+
+from utils.encoding import codec_args
+from utils.mp4index import avc_config
+from utils.store import put_bytes, put_file
+
+# ------------------------------------------------------------
+# HLS LADDER FOR MATCHUP PLAYBACK
+#   GF_HLS_LADDER   rungs as height:kbps, comma separated
+#                   (default "360:800,540:1600,720:3000");
+#                   empty disables packaging
+#   GF_HLS_SEGMENT  target segment length in seconds (default 4)
+#
+# After a render each rung is encoded from the matchup mp4 with the
+# "mobile" profile capped at its bitrate and cut into fMP4 segments
+# by ffmpeg's hls muxer. Every file (init segment, media segments,
+# playlists) goes into the media store, and the playlists are
+# rewritten to point at /hls/<sha>.<ext>: every URL is immutable,
+# so browsers and proxies may cache it forever.
+#
+#   matchups.hls_sha   master playlist
+#   matchup_hls        every object of the package (for gc/delete)
+# ------------------------------------------------------------
+LADDER = [
+    (int(h), int(k))
+    for h, k in (
+        rung.split(":")
+        for rung in os.environ.get("GF_HLS_LADDER", "360:800,540:1600,720:3000").split(",")
+        if rung.strip()
+    )
+]
+SEGMENT_SEC = float(os.environ.get("GF_HLS_SEGMENT", "4"))
+
+CONTENT_TYPES = {
+    "m3u8": "application/vnd.apple.mpegurl",
+    "m4s": "video/iso.segment",
+    "mp4": "video/mp4",
+}
+
+# every playlist and segment URL names its content
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+EXTINF = re.compile(r"^#EXTINF:([\d.]+)")
+MAP_URI = re.compile(r'URI="([^"]+)"')
+
+
+def url(sha, ext):
+    return f"/hls/{sha}.{ext}"
+
+
+def encode_rung(src, fps, height, kbps, out_dir):
+    """Encode and segment one rung into out_dir/index.m3u8."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    subprocess.run(
+        [
+            ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-i", src,
+            "-vf", f"scale=-2:{height}",
+            *codec_args(
+                "mobile",
+                maxrate=f"{kbps}k", bufsize=f"{2 * kbps}k",
+                gop=max(1, int(fps * SEGMENT_SEC)), threads=1,
+            ),
+            # matchups are VFR (a hold is two coded frames). A segment
+            # cut between those two frames loses the hold in fMP4, so
+            # the ladder is constant frame rate: repeats of a held
+            # frame cost x264 next to nothing
+            "-fps_mode", "cfr", "-r", str(fps),
+            "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SEC})",
+            "-f", "hls",
+            "-hls_time", str(SEGMENT_SEC),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4",
+            "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_segment_filename", os.path.join(out_dir, "seg_%04d.m4s"),
+            os.path.join(out_dir, "index.m3u8"),
+        ],
+        check=True, capture_output=True,
+    )
+
+
+def store_rung(out_dir):
+    """
+    Store one rung's files and its rewritten media playlist.
+    Returns (playlist sha, [all shas], peak bits/s, average bits/s, codecs).
+    """
+    shas = []
+    lines = []
+    duration = None
+    peak = 0
+    total_bits = 0
+    total_sec = 0.0
+
+    with open(os.path.join(out_dir, "index.m3u8")) as f:
+        for line in f.read().splitlines():
+            m = EXTINF.match(line)
+            if m:
+                duration = float(m.group(1))
+
+            if line.startswith("#EXT-X-MAP:"):
+                sha = put_file(os.path.join(out_dir, MAP_URI.search(line).group(1)))[0]
+                shas.append(sha)
+                line = MAP_URI.sub(f'URI="{url(sha, "mp4")}"', line)
+
+            elif line and not line.startswith("#"):
+                sha, size = put_file(os.path.join(out_dir, line))
+                shas.append(sha)
+                line = url(sha, "m4s")
+                if duration:
+                    peak = max(peak, size * 8 / duration)
+                    total_bits += size * 8
+                    total_sec += duration
+
+            lines.append(line)
+
+    playlist_sha = put_bytes(("\n".join(lines) + "\n").encode())[0]
+    shas.append(playlist_sha)
+
+    # avc1.PPCCLL from the SPS (after its one-byte NAL header)
+    config = avc_config(os.path.join(out_dir, "init.mp4"))
+    codecs = f"avc1.{config[1][0][2:8]}" if config and config[1] else "avc1.42e01e"
+
+    average = total_bits / total_sec if total_sec else 0
+    return playlist_sha, shas, int(peak), int(average), codecs
+
+
+def package_hls(ws, src, fps, width, height, workers=1, ladder=None):
+    """
+    Build and store the ladder for a rendered matchup.
+    Returns (master playlist sha, [every stored sha]) or (None, []).
+    """
+    ladder = LADDER if ladder is None else ladder
+    # never upscale
+    rungs = [(h, k) for h, k in ladder if h <= height] or ladder[:1]
+    if not rungs:
+        return None, []
+
+    dirs = [ws.path(f"hls_{h}") for h, _ in rungs]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(
+            lambda i: encode_rung(src, fps, rungs[i][0], rungs[i][1], dirs[i]),
+            range(len(rungs)),
+        ))
+
+    master = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    shas = []
+    for (h, _), d in zip(rungs, dirs):
+        playlist_sha, rung_shas, peak, average, codecs = store_rung(d)
+        shas += rung_shas
+        w = int(round(width * h / height / 2)) * 2
+        master.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={peak},AVERAGE-BANDWIDTH={average},"
+            f'RESOLUTION={w}x{h},CODECS="{codecs}"'
+        )
+        master.append(url(playlist_sha, "m3u8"))
+
+    master_sha = put_bytes(("\n".join(master) + "\n").encode())[0]
+    shas.append(master_sha)
+    return master_sha, shas
+
+
+def save_hls(conn, matchup_id, master_sha, shas):
+    """Point a matchup at its package (caller commits)."""
+    delete_hls(conn, matchup_id)
+    conn.execute("UPDATE matchups SET hls_sha=? WHERE id=?", (master_sha, matchup_id))
+    now = datetime.now()
+    conn.executemany(
+        "INSERT INTO matchup_hls (matchup_id, sha, created_at) VALUES (?, ?, ?)",
+        [(matchup_id, sha, now) for sha in dict.fromkeys(shas)]
+    )
+
+
+def delete_hls(conn, matchup_id):
+    """Drop the rows; the store objects go with the next gc."""
+    conn.execute("DELETE FROM matchup_hls WHERE matchup_id=?", (matchup_id,))
@@ -0,0 +1,153 @@
+import hashlib
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# ------------------------------------------------------------
+# STREAMING UPLOAD INGEST
+#   GF_MAX_UPLOAD_MB  largest accepted upload (default 1024)
+# The multipart body is parsed as it arrives: the file part goes
+# straight to its destination and is hashed on the way through, so
+# a 500 MB phone clip never sits in memory (or in a spooled copy)
+# and its SHA-256 is known without a second read.
+# ------------------------------------------------------------
+MAX_UPLOAD_BYTES = int(os.environ.get("GF_MAX_UPLOAD_MB", "1024")) * 1024 * 1024
+
+# multipart framing and the small form fields sent with the file
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class BadUpload(Exception):
+    pass
+
+
+async def receive_upload(request, path, file_field="file", max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Read a multipart upload form, writing its `file_field` part to
+    `path`. Returns (fields, size, sha256 hex): the other form fields
+    as strings, and size / sha None when no file was sent.
+
+    Raises UploadTooLarge as soon as the declared Content-Length or
+    the bytes received (chunked bodies too) pass max_bytes, and
+    BadUpload for a body that is not multipart form data; either way
+    the partial file is removed.
+    """
+    too_large = f"upload exceeds {max_bytes // (1024 * 1024)} MB"
+
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes + FORM_OVERHEAD:
+        raise UploadTooLarge(too_large)
+
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise BadUpload("expected multipart/form-data")
+
+    fields = {}
+    field_bytes = 0
+    h = hashlib.sha256()
+    size = None
+    out = None
+
+    # state of the part being parsed
+    part = {}
+
+    def on_part_begin():
+        part.clear()
+        part.update(headers={}, header=b"", value=b"", name=None, is_file=False, data=[])
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header"].lower()] = part["value"]
+        part["header"] = part["value"] = b""
+
+    def on_headers_finished():
+        nonlocal out, size
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition"))
+        part["name"] = disposition.get(b"name", b"").decode("utf-8", "replace")
+        part["is_file"] = b"filename" in disposition
+
+        # browsers send an empty, nameless file part when none was picked
+        if part["is_file"] and part["name"] == file_field and disposition[b"filename"] and out is None:
+            out = open(path, "wb")
+            size = 0
+
+    def on_part_data(data, start, end):
+        nonlocal size, field_bytes
+        chunk = data[start:end]
+
+        if part["is_file"]:
+            if part["name"] == file_field and out is not None and not out.closed:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(too_large)
+                h.update(chunk)
+                out.write(chunk)
+            return
+
+        field_bytes += len(chunk)
+        if field_bytes > FORM_OVERHEAD:
+            raise UploadTooLarge(too_large)
+        part["data"].append(chunk)
+
+    def on_part_end():
+        if part["is_file"]:
+            if part["name"] == file_field and out is not None:
+                out.close()
+        elif part["name"]:
+            fields.setdefault(part["name"], b"".join(part["data"]).decode("utf-8", "replace"))
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    received = 0
+    try:
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_bytes + FORM_OVERHEAD:
+                    raise UploadTooLarge(too_large)
+
+                # parsing, hashing and disk I/O off the event loop
+                await run_in_threadpool(parser.write, chunk)
+            parser.finalize()
+        except ValueError as e:
+            # python-multipart's parse errors
+            raise BadUpload(f"malformed upload: {e}")
+    except:
+        if out is not None:
+            out.close()
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    if out is not None and not out.closed:
+        # body ended inside the file part
+        out.close()
+        os.remove(path)
+        raise BadUpload("malformed upload: truncated file")
+
+    if size is None:
+        return fields, None, None
+    return fields, size, h.hexdigest()
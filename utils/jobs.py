@@ -0,0 +1,296 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from utils.db import db
+
+# ------------------------------------------------------------
+# RENDER WORKER POOL
+#   GF_RENDER_WORKERS  concurrent render processes (default 2)
+#   GF_RENDER_THREADS  threads per render for OpenCV + x264
+#                      (default: cores split across workers)
+# Jobs run in separate processes so decode / numpy / encode work
+# is not bound by the web server's GIL, and the pool size caps how
+# many renders compete for CPU at once.
+#
+# A worker that dies (crash, OOM kill, failed spawn import) breaks
+# the whole pool: submit() then replaces it. Jobs that had not
+# started are re-submitted (at most MAX_RESUBMITS times), the one
+# that was running is failed. Every future gets a done callback, so
+# an error raised outside run_job's own handling still fails the
+# job instead of leaving it queued / running forever.
+#
+#   GF_JOB_SWEEP_SEC   how often stale jobs are swept (default 60)
+# ------------------------------------------------------------
+RENDER_WORKERS = max(1, int(os.environ.get("GF_RENDER_WORKERS", "2")))
+RENDER_THREADS = int(os.environ.get(
+    "GF_RENDER_THREADS",
+    str(max(1, (os.cpu_count() or 1) // RENDER_WORKERS))
+))
+
+# a "running" job not updated for this long belonged to a dead process
+STALE_AFTER = timedelta(minutes=15)
+SWEEP_EVERY = float(os.environ.get("GF_JOB_SWEEP_SEC", "60"))
+
+# a job re-submitted after this many broken pools is failed instead
+MAX_RESUBMITS = 3
+
+POOL = None
+POOL_LOCK = threading.RLock()
+
+# jobs with a pending future in this process -> times re-submitted
+IN_FLIGHT = {}
+
+
+def init_worker(threads):
+    import cv2
+    cv2.setNumThreads(threads)
+
+
+def new_pool():
+    return ProcessPoolExecutor(
+        max_workers=RENDER_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(RENDER_THREADS,),
+    )
+
+
+def executor():
+    """Return the shared render pool, starting it on first use."""
+    global POOL
+
+    with POOL_LOCK:
+        if POOL is None:
+            POOL = new_pool()
+            threading.Thread(target=sweeper, daemon=True).start()
+            resume_pending()
+
+    return POOL
+
+
+def submit(job_id, resubmits=0):
+    """Hand a job to the pool, replacing the pool if it is broken."""
+    global POOL
+
+    with POOL_LOCK:
+        pool = executor()
+        if job_id in IN_FLIGHT:
+            # already picked up by the sweep in executor()
+            return
+        try:
+            future = pool.submit(run_job, job_id)
+        except BrokenProcessPool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            POOL = new_pool()
+            future = POOL.submit(run_job, job_id)
+        IN_FLIGHT[job_id] = resubmits
+
+    future.add_done_callback(lambda f: job_finished(job_id, f))
+
+
+def job_finished(job_id, future):
+    """Done callback: fail a job whose future errored."""
+    with POOL_LOCK:
+        resubmits = IN_FLIGHT.pop(job_id, 0)
+
+    if future.cancelled():
+        fail_job(job_id, "cancelled")
+        return
+
+    exc = future.exception()
+    if exc is None:
+        return
+
+    if isinstance(exc, BrokenProcessPool) and job_status(job_id) == "queued":
+        # never started: its worker pool went away under it
+        if resubmits < MAX_RESUBMITS:
+            submit(job_id, resubmits + 1)
+            return
+
+    if isinstance(exc, BrokenProcessPool):
+        fail_job(job_id, "render worker died")
+    else:
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+        fail_job(job_id, str(exc) or type(exc).__name__)
+
+
+def sweeper():
+    """Periodically fail stale jobs and pick up queued ones nobody holds."""
+    while True:
+        time.sleep(SWEEP_EVERY)
+        try:
+            resume_pending()
+        except Exception:
+            traceback.print_exc()
+
+
+# ------------------------------------------------------------
+# JOB TABLE HELPERS
+# ------------------------------------------------------------
+def enqueue(kind, params):
+    """Persist a new job and hand it to the worker pool. Returns job id."""
+    now = datetime.now()
+
+    conn = db()
+    cur = conn.execute(
+        "INSERT INTO render_jobs (kind, params, status, progress, created_at, updated_at) "
+        "VALUES (?, ?, 'queued', 0, ?, ?)",
+        (kind, json.dumps(params), now, now)
+    )
+    job_id = cur.lastrowid
+    conn.commit()
+    conn.close()
+
+    submit(job_id)
+    return job_id
+
+
+def get_job(job_id):
+    conn = db()
+    row = conn.execute(
+        "SELECT id, kind, status, progress, message, result_id "
+        "FROM render_jobs WHERE id=?",
+        (job_id,)
+    ).fetchone()
+    conn.close()
+
+    if not row:
+        return None
+
+    return {
+        "id": row[0],
+        "kind": row[1],
+        "status": row[2],
+        "progress": row[3],
+        "message": row[4],
+        "result_id": row[5],
+    }
+
+
+def active_jobs(kind):
+    """Queued and running jobs of one kind, oldest first."""
+    conn = db()
+    rows = conn.execute(
+        "SELECT id, params, status, progress FROM render_jobs "
+        "WHERE kind=? AND status IN ('queued', 'running') ORDER BY id",
+        (kind,)
+    ).fetchall()
+    conn.close()
+
+    return [
+        {"id": r[0], "params": json.loads(r[1]), "status": r[2], "progress": r[3]}
+        for r in rows
+    ]
+
+
+def job_status(job_id):
+    conn = db()
+    row = conn.execute("SELECT status FROM render_jobs WHERE id=?", (job_id,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def fail_job(job_id, message):
+    """Mark a job failed unless it already finished."""
+    conn = db()
+    conn.execute(
+        "UPDATE render_jobs SET status='failed', message=?, updated_at=? "
+        "WHERE id=? AND status IN ('queued', 'running')",
+        (message, datetime.now(), job_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def update_job(job_id, **fields):
+    fields["updated_at"] = datetime.now()
+    cols = ", ".join(f"{k}=?" for k in fields)
+
+    conn = db()
+    conn.execute(
+        f"UPDATE render_jobs SET {cols} WHERE id=?",
+        (*fields.values(), job_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def resume_pending():
+    """
+    Fail jobs whose worker died mid-render (no update for
+    STALE_AFTER) and submit queued jobs this process is not already
+    running: left from before a restart, or lost with a pool. Runs at
+    pool start and every SWEEP_EVERY seconds.
+    """
+    conn = db()
+    conn.execute(
+        "UPDATE render_jobs SET status='failed', message='interrupted', updated_at=? "
+        "WHERE status='running' AND updated_at < ?",
+        (datetime.now(), datetime.now() - STALE_AFTER)
+    )
+    conn.commit()
+    ids = [r[0] for r in conn.execute(
+        "SELECT id FROM render_jobs WHERE status='queued' ORDER BY id"
+    ).fetchall()]
+    conn.close()
+
+    for job_id in ids:
+        submit(job_id)
+
+
+# ------------------------------------------------------------
+# WORKER ENTRY POINT (runs inside a pool process)
+# ------------------------------------------------------------
+def run_job(job_id):
+    conn = db()
+    # claim atomically so a job submitted twice only renders once
+    claimed = conn.execute(
+        "UPDATE render_jobs SET status='running', updated_at=? "
+        "WHERE id=? AND status='queued'",
+        (datetime.now(), job_id)
+    ).rowcount
+    row = conn.execute(
+        "SELECT kind, params FROM render_jobs WHERE id=?", (job_id,)
+    ).fetchone()
+    conn.commit()
+    conn.close()
+
+    if not claimed or not row:
+        return
+
+    kind, params = row[0], json.loads(row[1])
+
+    last = [0.0]
+
+    def progress(frac):
+        # throttle DB writes to ~2% steps
+        if frac - last[0] >= 0.02:
+            last[0] = frac
+            update_job(job_id, progress=round(frac, 3))
+
+    try:
+        if kind == "matchup":
+            from utils.render import build_matchup
+            result_id = build_matchup(
+                params["pitch_id"],
+                params["swing_id"],
+                params.get("description", ""),
+                progress=progress,
+                threads=RENDER_THREADS,
+                profile=params.get("profile", "preview"),
+            )
+        else:
+            raise ValueError(f"unknown job kind: {kind}")
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status="failed", message=str(e) or type(e).__name__)
+        return
+
+    update_job(job_id, status="done", progress=1.0, result_id=result_id)
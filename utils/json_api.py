@@ -0,0 +1,29 @@
+import hashlib
+import json
+
+from fastapi.responses import Response
+
+from utils.streaming import not_modified
+
+# ------------------------------------------------------------
+# SMALL CACHEABLE JSON RESPONSES
+# For lookups a page fetches as the user drills down (e.g. the
+# matchup selector). The ETag is a hash of the body, so it changes
+# exactly when the data does; browsers keep the response and
+# revalidate it on every use (no-cache), and an unchanged list
+# costs a 304 with no body. Private: the lists are per-deployment
+# library data, not for shared caches.
+# ------------------------------------------------------------
+CACHE_CONTROL = "private, no-cache"
+
+
+def json_response(request, data):
+    """200 with a strong ETag, or 304 when If-None-Match matches."""
+    body = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,416 @@
+import sqlite3
+
+from utils import summary
+from utils.store import put_bytes, put_stream
+
+# ------------------------------------------------------------
+# NUMBERED SCHEMA MIGRATIONS
+# PRAGMA user_version records the last migration applied to a
+# database file. migrate() runs every newer one in order, each in
+# its own IMMEDIATE transaction together with the version bump, so
+# two processes starting at once cannot both apply a step and a
+# failed step leaves the file at the previous version.
+#
+# Append new steps; never edit or renumber shipped ones. A step is
+# a SQL script or a function taking the connection.
+#
+# utils.db applies pending migrations the first time a process
+# opens a database; init_db.py does the same for a fresh file.
+# ------------------------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS pitchers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER,
+    name TEXT NOT NULL,
+    description TEXT,
+    FOREIGN KEY (team_id) REFERENCES teams(id)
+);
+
+CREATE TABLE IF NOT EXISTS hitters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER,
+    name TEXT NOT NULL,
+    description TEXT,
+    FOREIGN KEY (team_id) REFERENCES teams(id)
+);
+
+CREATE TABLE IF NOT EXISTS pitch_clips (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER,
+    pitcher_id INTEGER,
+    description TEXT,
+    clip_sha TEXT,
+    clip_size INTEGER,
+    source_sha TEXT,
+    sample_index TEXT,
+    fps REAL,
+    created_at TIMESTAMP,
+    FOREIGN KEY (team_id) REFERENCES teams(id),
+    FOREIGN KEY (pitcher_id) REFERENCES pitchers(id)
+);
+
+CREATE TABLE IF NOT EXISTS swing_clips (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER,
+    hitter_id INTEGER,
+    description TEXT,
+    clip_sha TEXT,
+    clip_size INTEGER,
+    source_sha TEXT,
+    sample_index TEXT,
+    fps REAL,
+    decision_frame INTEGER,
+    created_at TIMESTAMP,
+    FOREIGN KEY (team_id) REFERENCES teams(id),
+    FOREIGN KEY (hitter_id) REFERENCES hitters(id)
+);
+
+CREATE TABLE IF NOT EXISTS matchups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pitch_clip_id INTEGER,
+    swing_clip_id INTEGER,
+    description TEXT,
+    matchup_sha TEXT,
+    matchup_size INTEGER,
+    thumb_sha TEXT,
+    manifest TEXT,
+    hls_sha TEXT,
+    created_at TIMESTAMP,
+    FOREIGN KEY (pitch_clip_id) REFERENCES pitch_clips(id),
+    FOREIGN KEY (swing_clip_id) REFERENCES swing_clips(id)
+);
+
+CREATE TABLE IF NOT EXISTS clip_fingerprints (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    clip_id INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    hashes TEXT NOT NULL,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_clip_fingerprints_kind
+    ON clip_fingerprints(kind, samples);
+
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    owner_id INTEGER NOT NULL,
+    variant TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    created_at TIMESTAMP,
+    UNIQUE (owner, owner_id, variant)
+);
+
+CREATE TABLE IF NOT EXISTS matchup_hls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    matchup_id INTEGER NOT NULL,
+    sha TEXT NOT NULL,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_matchup_hls_matchup ON matchup_hls(matchup_id);
+CREATE INDEX IF NOT EXISTS idx_matchup_hls_sha ON matchup_hls(sha);
+
+CREATE TABLE IF NOT EXISTS render_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    progress REAL DEFAULT 0,
+    message TEXT,
+    result_id INTEGER,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+"""
+
+# columns added after a table first shipped; CREATE TABLE IF NOT
+# EXISTS leaves existing tables alone, so add them here
+ADDED_COLUMNS = [
+    ("pitch_clips", "source_sha", "TEXT"),
+    ("swing_clips", "source_sha", "TEXT"),
+    ("matchups", "manifest", "TEXT"),
+    ("pitch_clips", "sample_index", "TEXT"),
+    ("swing_clips", "sample_index", "TEXT"),
+    ("matchups", "hls_sha", "TEXT"),
+]
+
+
+
+def baseline(conn):
+    """
+    The schema init_db.py used to create, brought up to date on files
+    made by any earlier init_db.py (or the old Streamlit app).
+    """
+    run_script(conn, SCHEMA)
+
+    for table, col, decl in ADDED_COLUMNS:
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if col not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
+
+    # indexes on added columns (must run after the ALTERs)
+    run_script(conn, """
+    CREATE INDEX IF NOT EXISTS idx_pitch_clips_source_sha ON pitch_clips(source_sha);
+    CREATE INDEX IF NOT EXISTS idx_swing_clips_source_sha ON swing_clips(source_sha);
+    """)
+
+
+# library and selector pages filter on the foreign keys and list
+# newest first: (fk, created_at) serves both the WHERE and the
+# ORDER BY without a sort
+LIBRARY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_pitch_clips_created ON pitch_clips(created_at);
+CREATE INDEX IF NOT EXISTS idx_pitch_clips_pitcher ON pitch_clips(pitcher_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_pitch_clips_team ON pitch_clips(team_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_swing_clips_created ON swing_clips(created_at);
+CREATE INDEX IF NOT EXISTS idx_swing_clips_hitter ON swing_clips(hitter_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_swing_clips_team ON swing_clips(team_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_matchups_created ON matchups(created_at);
+CREATE INDEX IF NOT EXISTS idx_matchups_pitch ON matchups(pitch_clip_id);
+CREATE INDEX IF NOT EXISTS idx_matchups_swing ON matchups(swing_clip_id);
+
+CREATE INDEX IF NOT EXISTS idx_pitchers_team ON pitchers(team_id, name);
+CREATE INDEX IF NOT EXISTS idx_hitters_team ON hitters(team_id, name);
+
+CREATE INDEX IF NOT EXISTS idx_clip_fingerprints_clip ON clip_fingerprints(kind, clip_id);
+CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON render_jobs(status, kind);
+"""
+
+
+def matchup_summary(conn):
+    """The library's read model (utils/summary.py), filled from existing matchups."""
+    run_script(conn, summary.TABLE)
+    summary.rebuild_summary(conn)
+
+
+def payloads_in_store(conn):
+    """
+    Formerly moved BLOB payloads here, inside the migration's
+    transaction. That move is now move_payloads(), run by
+    migrate_blobs.py / init_db.py; migrate() refuses files that
+    still need it, so this step only confirms there is nothing left.
+    """
+    left = pending_payloads(conn)
+    if left:
+        raise LegacyPayloads(left)
+
+
+# every file gets these, whichever code stamped its earlier versions
+def catch_up(conn):
+    """Columns and indexes a file at version 1-4 may lack."""
+    add_columns(conn, ADDED_COLUMNS + STORE_COLUMNS)
+    run_script(conn, """
+    CREATE INDEX IF NOT EXISTS idx_pitch_clips_source_sha ON pitch_clips(source_sha);
+    CREATE INDEX IF NOT EXISTS idx_swing_clips_source_sha ON swing_clips(source_sha);
+    """)
+    run_script(conn, LIBRARY_INDEXES)
+    run_script(conn, summary.TABLE)
+
+
+MIGRATIONS = [
+    (1, "baseline schema", baseline),
+    (2, "library indexes", LIBRARY_INDEXES),
+    (3, "matchup summary", matchup_summary),
+    (4, "payloads into the media store", payloads_in_store),
+    (5, "schema catch-up", catch_up),
+]
+
+
+# ------------------------------------------------------------
+# PAYLOAD BLOBs → MEDIA STORE
+# Files from before the media store keep videos and thumbnails as
+# BLOBs in the rows themselves. Copying them out can take minutes
+# on a real library, so it is not a migration step (those run in
+# one write transaction on the web app's first connection): run
+#
+#   python migrate_blobs.py [path/to/app.db]
+#
+# (init_db.py does the same). Until then migrate() refuses the file
+# with LegacyPayloads.
+# ------------------------------------------------------------
+# media store references, added in place of the BLOBs
+STORE_COLUMNS = [
+    ("pitch_clips", "clip_sha", "TEXT"),
+    ("pitch_clips", "clip_size", "INTEGER"),
+    ("swing_clips", "clip_sha", "TEXT"),
+    ("swing_clips", "clip_size", "INTEGER"),
+    ("matchups", "matchup_sha", "TEXT"),
+    ("matchups", "matchup_size", "INTEGER"),
+    ("matchups", "thumb_sha", "TEXT"),
+]
+
+# (table, old BLOB column, sha column, size column)
+BLOB_MOVES = [
+    ("pitch_clips", "clip_blob", "clip_sha", "clip_size"),
+    ("swing_clips", "clip_blob", "clip_sha", "clip_size"),
+    ("matchups", "matchup_blob", "matchup_sha", "matchup_size"),
+    ("matchups", "thumb", "thumb_sha", None),
+]
+
+# rows moved per write transaction
+BLOB_BATCH = 16
+
+
+class LegacyPayloads(RuntimeError):
+    def __init__(self, left):
+        super().__init__(
+            "database still keeps media payloads as BLOBs or lacks the media "
+            f"store columns ({', '.join(left)}): run python migrate_blobs.py first"
+        )
+
+
+def columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def add_columns(conn, wanted):
+    for table, col, decl in wanted:
+        cols = columns(conn, table)
+        if cols and col not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
+
+
+def pending_payloads(conn):
+    """table.column entries that still need move_payloads()."""
+    left = []
+    for table, blob_col, sha_col, size_col in BLOB_MOVES:
+        cols = columns(conn, table)
+        if not cols:
+            continue
+        if sha_col not in cols:
+            left.append(f"{table}.{sha_col}")
+        elif blob_col in cols and conn.execute(
+            f"SELECT 1 FROM {table} WHERE {blob_col} IS NOT NULL LIMIT 1"
+        ).fetchone():
+            left.append(f"{table}.{blob_col}")
+    return left
+
+
+def read_blob(conn, table, col, row_id):
+    """Store one BLOB. Returns (sha, size)."""
+    if hasattr(conn, "blobopen"):
+        # incremental BLOB I/O (Python 3.11+): never holds the whole video in memory
+        with conn.blobopen(table, col, row_id, readonly=True) as blob:
+            return put_stream(blob)
+
+    data = conn.execute(f"SELECT {col} FROM {table} WHERE id=?", (row_id,)).fetchone()[0]
+    return put_bytes(bytes(data))
+
+
+def move_payloads(conn, batch=BLOB_BATCH):
+    """
+    Add the store columns, copy every BLOB into the store and drop
+    the BLOB columns (SQLite >= 3.35, otherwise they stay NULL).
+    Commits every `batch` rows, so other connections are only held
+    up briefly; safe to interrupt and re-run. Returns rows moved.
+    """
+    add_columns(conn, STORE_COLUMNS)
+    conn.commit()
+
+    moved = 0
+    for table, blob_col, sha_col, size_col in BLOB_MOVES:
+        if blob_col not in columns(conn, table):
+            continue
+
+        while True:
+            ids = [r[0] for r in conn.execute(
+                f"SELECT id FROM {table} "
+                f"WHERE {blob_col} IS NOT NULL AND {sha_col} IS NULL LIMIT ?",
+                (batch,)
+            ).fetchall()]
+            if not ids:
+                break
+
+            for row_id in ids:
+                sha, size = read_blob(conn, table, blob_col, row_id)
+                if size_col:
+                    conn.execute(
+                        f"UPDATE {table} SET {sha_col}=?, {size_col}=?, {blob_col}=NULL WHERE id=?",
+                        (sha, size, row_id)
+                    )
+                else:
+                    conn.execute(
+                        f"UPDATE {table} SET {sha_col}=?, {blob_col}=NULL WHERE id=?",
+                        (sha, row_id)
+                    )
+            conn.commit()
+            moved += len(ids)
+
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        for table, blob_col, sha_col, size_col in BLOB_MOVES:
+            if blob_col in columns(conn, table):
+                conn.execute(f"ALTER TABLE {table} DROP COLUMN {blob_col}")
+        conn.commit()
+
+    # thumbnails moved: the library's copy of thumb_sha
+    if columns(conn, "matchup_summary"):
+        summary.rebuild_summary(conn)
+        conn.commit()
+
+    return moved
+
+
+def run_script(conn, sql):
+    """
+    Run a multi-statement script statement by statement. Unlike
+    executescript() this does not commit, so it stays inside the
+    migration's transaction.
+    """
+    stmt = ""
+    for line in sql.splitlines(keepends=True):
+        stmt += line
+        if sqlite3.complete_statement(stmt):
+            conn.execute(stmt)
+            stmt = ""
+    if stmt.strip():
+        conn.execute(stmt)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Apply pending migrations. Returns the numbers applied.
+    Raises LegacyPayloads for a file migrate_blobs.py has to move
+    first.
+    """
+    if schema_version(conn) < MIGRATIONS[-1][0]:
+        left = pending_payloads(conn)
+        if left:
+            raise LegacyPayloads(left)
+
+    applied = []
+    for number, name, step in MIGRATIONS:
+        if number <= schema_version(conn):
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have applied it while we waited
+            if number > schema_version(conn):
+                if callable(step):
+                    step(conn)
+                else:
+                    run_script(conn, step)
+                conn.execute(f"PRAGMA user_version={number}")
+                applied.append(number)
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+
+    return applied
@@ -0,0 +1,268 @@
+import json
+import os
+import struct
+import tempfile
+
+import cv2
+
+from utils.store import exists, object_path
+from utils.workspace import scratch_root
+
+# ------------------------------------------------------------
+# MP4 SAMPLE INDEX FOR ALL-INTRA CLIPS
+# Pitch / swing clips are encoded with -g 1, so every sample is an
+# IDR frame that decodes on its own. The index records, for the
+# video track, the byte offset and size of every sample plus the
+# SPS/PPS from avcC:
+#
+#   {"nal_len": 4, "sps": [hex], "pps": [hex],
+#    "offsets": [...], "sizes": [...]}
+#
+# Frame n is then one pread of sizes[n] bytes, rewritten as an
+# Annex-B access unit and decoded alone: no container demux, no
+# seek from a keyframe, and sample n is exactly frame n (no
+# B-frames, so decode order is presentation order).
+# ------------------------------------------------------------
+START_CODE = b"\x00\x00\x00\x01"
+
+
+def boxes(data, start=0, end=None):
+    """Yield (type, payload start, payload end) for boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        head = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            head = 16
+        elif size == 0:
+            size = end - pos
+        if size < head:
+            return
+        yield kind, pos + head, min(pos + size, end)
+        pos += size
+
+
+def find(data, start, end, kind):
+    for k, s, e in boxes(data, start, end):
+        if k == kind:
+            return s, e
+    return None
+
+
+def read_moov(path):
+    """Return the raw moov box payload without reading mdat."""
+    with open(path, "rb") as f:
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                return None
+            size, kind = struct.unpack(">I4s", head)
+            head_len = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                head_len = 16
+            if kind == b"moov":
+                return f.read(size - head_len)
+            if size == 0:
+                return None
+            f.seek(size - head_len, 1)
+
+
+def parse_avcc(data, s, e):
+    """(nal length size, [sps], [pps]) from an avcC payload."""
+    nal_len = (data[s + 4] & 0x03) + 1
+    pos = s + 5
+
+    def params(count, pos):
+        out = []
+        for _ in range(count):
+            n = struct.unpack(">H", data[pos:pos + 2])[0]
+            out.append(data[pos + 2:pos + 2 + n].hex())
+            pos += 2 + n
+        return out, pos
+
+    sps, pos = params(data[pos] & 0x1F, pos + 1)
+    pps, pos = params(data[pos], pos + 1)
+    return nal_len, sps, pps
+
+
+def stbl_avcc(data, s, e):
+    """(nal length size, [sps], [pps]) from an stbl's sample description, or None."""
+    stsd = find(data, s, e, b"stsd")
+    if not stsd:
+        return None
+    # stsd: version/flags(4) entry_count(4), then sample entries
+    entry = next(boxes(data, stsd[0] + 8, stsd[1]), None)
+    if not entry or entry[0] not in (b"avc1", b"avc3"):
+        return None
+    # VisualSampleEntry has 78 bytes of fixed fields before child boxes
+    avcc = find(data, entry[1] + 78, entry[2], b"avcC")
+    if not avcc:
+        return None
+    return parse_avcc(data, *avcc)
+
+
+def parse_stbl(data, s, e):
+    # ---------- avcC from the sample description ----------
+    config = stbl_avcc(data, s, e)
+    if not config:
+        return None
+    nal_len, sps, pps = config
+
+    # ---------- sample sizes ----------
+    stsz = find(data, s, e, b"stsz")
+    uniform, count = struct.unpack(">II", data[stsz[0] + 4:stsz[0] + 12])
+    if uniform:
+        sizes = [uniform] * count
+    else:
+        sizes = list(struct.unpack(f">{count}I", data[stsz[0] + 12:stsz[0] + 12 + 4 * count]))
+
+    # ---------- every sample must be a sync (key) frame ----------
+    # no stss box means all samples are sync samples
+    stss = find(data, s, e, b"stss")
+    if stss and struct.unpack(">I", data[stss[0] + 4:stss[0] + 8])[0] != count:
+        return None
+
+    # ---------- chunk offsets ----------
+    co = find(data, s, e, b"stco")
+    if co:
+        n = struct.unpack(">I", data[co[0] + 4:co[0] + 8])[0]
+        chunks = struct.unpack(f">{n}I", data[co[0] + 8:co[0] + 8 + 4 * n])
+    else:
+        co = find(data, s, e, b"co64")
+        n = struct.unpack(">I", data[co[0] + 4:co[0] + 8])[0]
+        chunks = struct.unpack(f">{n}Q", data[co[0] + 8:co[0] + 8 + 8 * n])
+
+    # ---------- samples per chunk (run-length) ----------
+    sc = find(data, s, e, b"stsc")
+    n = struct.unpack(">I", data[sc[0] + 4:sc[0] + 8])[0]
+    runs = [
+        struct.unpack(">III", data[sc[0] + 8 + 12 * i:sc[0] + 20 + 12 * i])
+        for i in range(n)
+    ]
+
+    offsets = []
+    sample = 0
+    for r, (first_chunk, per_chunk, _) in enumerate(runs):
+        last_chunk = runs[r + 1][0] - 1 if r + 1 < len(runs) else len(chunks)
+        for chunk in range(first_chunk - 1, last_chunk):
+            pos = chunks[chunk]
+            for _ in range(per_chunk):
+                if sample >= count:
+                    break
+                offsets.append(pos)
+                pos += sizes[sample]
+                sample += 1
+
+    if len(offsets) != count:
+        return None
+
+    return {"nal_len": nal_len, "sps": sps, "pps": pps, "offsets": offsets, "sizes": sizes}
+
+
+def video_stbl(moov):
+    """(start, end) of the first video track's stbl box in moov, or None."""
+    for kind, s, e in boxes(moov):
+        if kind != b"trak":
+            continue
+        mdia = find(moov, s, e, b"mdia")
+        if not mdia:
+            continue
+        hdlr = find(moov, mdia[0], mdia[1], b"hdlr")
+        # hdlr: version/flags(4) pre_defined(4) handler_type(4)
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+        minf = find(moov, mdia[0], mdia[1], b"minf")
+        stbl = minf and find(moov, minf[0], minf[1], b"stbl")
+        if stbl:
+            return stbl
+
+    return None
+
+
+def build_index(path):
+    """Sample index of the first H.264 video track, or None."""
+    moov = read_moov(path)
+    stbl = moov and video_stbl(moov)
+    return parse_stbl(moov, *stbl) if stbl else None
+
+
+def avc_config(path):
+    """(nal length size, [sps], [pps]) of an mp4's H.264 track, or None."""
+    moov = read_moov(path)
+    stbl = moov and video_stbl(moov)
+    return stbl_avcc(moov, *stbl) if stbl else None
+
+
+# ------------------------------------------------------------
+# SINGLE-SAMPLE DECODE
+# ------------------------------------------------------------
+def sample_annexb(path, index, n):
+    """Frame n as a self-contained Annex-B access unit (SPS + PPS + slices)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        data = os.pread(fd, index["sizes"][n], index["offsets"][n])
+    finally:
+        os.close(fd)
+
+    out = bytearray()
+    for p in index["sps"] + index["pps"]:
+        out += START_CODE + bytes.fromhex(p)
+
+    nal_len = index["nal_len"]
+    pos = 0
+    while pos + nal_len <= len(data):
+        size = int.from_bytes(data[pos:pos + nal_len], "big")
+        pos += nal_len
+        out += START_CODE + data[pos:pos + size]
+        pos += size
+
+    return bytes(out)
+
+
+def decode_frame(path, index, n):
+    """Decode frame n of an indexed all-intra clip. Returns BGR or None."""
+    if not index or not 0 <= n < len(index["sizes"]):
+        return None
+
+    fd, tmp = tempfile.mkstemp(prefix="gf_sample_", suffix=".h264", dir=scratch_root())
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(sample_annexb(path, index, n))
+
+        cap = cv2.VideoCapture(tmp, cv2.CAP_FFMPEG)
+        ret, fr = cap.read()
+        cap.release()
+    finally:
+        os.remove(tmp)
+
+    return fr if ret else None
+
+
+# ------------------------------------------------------------
+# STORED CLIPS
+# The index is computed at finalize and kept in the clip row
+# (sample_index, JSON); clips finalized earlier get theirs on first
+# use.
+# ------------------------------------------------------------
+def clip_index(conn, table, clip_id):
+    """(media store path, sample index or None) for a pitch/swing clip."""
+    row = conn.execute(
+        f"SELECT clip_sha, sample_index FROM {table} WHERE id=?", (clip_id,)
+    ).fetchone()
+    if not row or not exists(row[0]):
+        return None, None
+
+    path = object_path(row[0])
+    if row[1]:
+        return path, json.loads(row[1])
+
+    index = build_index(path)
+    if index:
+        conn.execute(
+            f"UPDATE {table} SET sample_index=? WHERE id=?", (json.dumps(index), clip_id)
+        )
+        conn.commit()
+    return path, index
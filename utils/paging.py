@@ -0,0 +1,63 @@
+import os
+from urllib.parse import urlencode
+
+# ------------------------------------------------------------
+# KEYSET PAGINATION FOR LIBRARY LISTINGS
+#   GF_PAGE_SIZE   rows per page / per infinite-scroll fetch (default 24)
+#
+# Lists are newest first, ordered by (created_at, id) descending.
+# The cursor is the (created_at, id) of the last row shown; the
+# next page is the rows strictly before it:
+#
+#   WHERE ... AND (created_at, id) < (?, ?)
+#   ORDER BY created_at DESC, id DESC LIMIT n
+#
+# With a (filter, created_at) index this is an index range read of
+# n rows wherever the page is, unlike OFFSET, and rows inserted
+# meanwhile never shift or repeat a page.
+# ------------------------------------------------------------
+PAGE_SIZE = max(1, int(os.environ.get("GF_PAGE_SIZE", "24")))
+
+
+def encode_cursor(created_at, row_id):
+    return f"{created_at}|{row_id}"
+
+
+def decode_cursor(cursor):
+    """(created_at, id) or None for a missing / malformed cursor."""
+    created_at, sep, row_id = (cursor or "").rpartition("|")
+    if not sep or not row_id.isdigit():
+        return None
+    return created_at, int(row_id)
+
+
+def keyset_page(conn, select, filters, params, cursor, key, size=PAGE_SIZE,
+                created="created_at", row_id="id"):
+    """
+    One page of `select` (no WHERE / ORDER BY of its own).
+    filters / params: WHERE terms ANDed together and their values
+    key(row): the row's (created_at, id)
+    Returns (rows, cursor of the next page or None).
+    """
+    filters = list(filters)
+    params = list(params)
+
+    after = decode_cursor(cursor)
+    if after:
+        filters.append(f"({created}, {row_id}) < (?, ?)")
+        params += list(after)
+
+    sql = select
+    if filters:
+        sql += " WHERE " + " AND ".join(filters)
+    sql += f" ORDER BY {created} DESC, {row_id} DESC LIMIT ?"
+
+    rows = conn.execute(sql, params + [size + 1]).fetchall()
+    if len(rows) <= size:
+        return rows, None
+    return rows[:size], encode_cursor(*key(rows[size - 1]))
+
+
+def page_url(path, cursor, **query):
+    """URL of the page after `cursor`, keeping the current filters."""
+    return f"{path}?{urlencode({**query, 'cursor': cursor})}"
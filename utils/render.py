@@ -0,0 +1,428 @@
+import json
+import os
+import threading
+import traceback
+import cv2
+import numpy as np
+from datetime import datetime
+
+from utils.db import db
+from utils.encoding import codec_args
+from utils.frame_cache import frame_stack
+from utils.hls import package_hls, save_hls
+from utils.store import object_path, put_bytes, put_file
+from utils.summary import refresh_summary
+from utils.thumbs import encode_sizes, save_image
+from utils.timeline import EFFECTS, is_hold, matchup_timeline, source_frames, split, to_manifest
+from utils.video import encode_parts_to_mp4
+from utils.workspace import job_workspace
+
+
+def tint(frame, color, out=None):
+    """80/20 blend with a solid colour; out=frame tints in place."""
+    overlay = np.full_like(frame, color)
+    return cv2.addWeighted(frame, 0.8, overlay, 0.2, 0, dst=out)
+
+
+def compose(out, left, right):
+    """Write two 640-wide halves side by side into a preallocated frame."""
+    out[:, :640] = left
+    out[:, 640:] = right
+    return out
+
+
+# ------------------------------------------------------------
+# PARALLEL ENCODE
+#   GF_SEGMENT_FRAMES  longest stretch of motion encoded as one
+#                      segment (default 60); shorter segments spread
+#                      a render over more cores
+# A render with `threads` threads encodes that many segments at
+# once, each with a single-threaded x264.
+# ------------------------------------------------------------
+SEGMENT_FRAMES = max(1, int(os.environ.get("GF_SEGMENT_FRAMES", "60")))
+
+
+# ------------------------------------------------------------
+# RENDER TAP POINTS
+# Output frames copied out of the pipeline as they are composed, so
+# nothing has to decode the finished video:
+#   thumb      first frame after the title card: matchups.thumb and
+#              the w120 / w240 / w480 library sizes
+#   sheet_<n>  SHEET_FRAMES frames spread over the clip, tiled into
+#              the "sheet" contact strip
+# Freeze stills are taken from the freeze frames themselves.
+# Positions are frames on the manifest's nominal fps timeline.
+# ------------------------------------------------------------
+SHEET_FRAMES = 8
+SHEET_TILE_W = 240
+
+
+def tap_positions(manifest):
+    """{output frame: [tap names]}"""
+    first = manifest["title"][1]
+    total = manifest["total_frames"]
+    if first >= total:
+        return {}
+
+    taps = {first: ["thumb"]}
+    for n in range(SHEET_FRAMES):
+        taps.setdefault(first + n * (total - first) // SHEET_FRAMES, []).append(f"sheet_{n}")
+    return taps
+
+
+def contact_sheet(frames):
+    tiles = []
+    for fr in frames:
+        h, w = fr.shape[:2]
+        tile_h = max(1, int(round(h * SHEET_TILE_W / w)))
+        tiles.append(cv2.resize(fr, (SHEET_TILE_W, tile_h), interpolation=cv2.INTER_AREA))
+    return np.hstack(tiles)
+
+
+def render_images(tapped, held):
+    """
+    (full-size thumbnail jpg or None, {image variant: (jpg, w, h)})
+    from the tapped frames and the freeze frames.
+    """
+    images = {}
+
+    def add(variant, img):
+        ok, j = cv2.imencode(".jpg", img)
+        if ok:
+            images[variant] = (j.tobytes(), img.shape[1], img.shape[0])
+
+    # full composite plus the pitch half of each freeze
+    for name, frame in held.items():
+        add(name, frame)
+        add(f"{name}_pitch", frame[:, :640])
+
+    sheet = [tapped[f"sheet_{n}"] for n in range(SHEET_FRAMES) if f"sheet_{n}" in tapped]
+    if sheet:
+        add("sheet", contact_sheet(sheet))
+
+    thumb = None
+    if "thumb" in tapped:
+        ok, j = cv2.imencode(".jpg", tapped["thumb"])
+        if ok:
+            thumb = j.tobytes()
+        for variant, data, w, h in encode_sizes(tapped["thumb"]):
+            images[variant] = (data, w, h)
+
+    return thumb, images
+
+
+# ------------------------------------------------------------
+# RENDER A MATCHUP VIDEO
+# All scratch files live inside the caller's job workspace, so
+# concurrent builds never share a path.
+# progress(fraction) is called as the encode advances.
+# pitch_frames / swing_frames are (N, 720, 640, 3) letterboxed
+# stacks from utils.frame_cache.
+# profile names the utils/encoding profile of the output.
+# Returns (path of the mp4 inside ws, thumbnail jpg bytes or None,
+#          timeline manifest dict, {image variant: (jpg, w, h)}).
+# ------------------------------------------------------------
+def render_matchup(
+    ws,
+    pitch_frames, pitch_fps,
+    swing_frames, swing_fps, decision_frame,
+    pitcher_name, pitcher_team,
+    hitter_name, hitter_team,
+    description,
+    progress=None,
+    threads=0,
+    profile="preview"
+):
+    fps = min(pitch_fps, swing_fps)
+
+    # letterboxed 640x720 stacks (memory-mapped from the frame cache)
+    pitch = pitch_frames
+    swing = swing_frames
+
+    if progress:
+        progress(0.1)
+
+    # ---------------------------------------------
+    # SWING DURATION (seconds)
+    # ---------------------------------------------
+    swing_duration_sec = len(swing) / swing_fps
+
+    # ------------------------------------------------------------
+    # BEAUTIFULLY CENTERED TITLE CARD
+    # ------------------------------------------------------------
+    title = np.zeros((720, 1280, 3), dtype=np.uint8)
+
+    # ---------- helpers ----------
+    # ---------- helpers ----------
+    def put_center_text(img, text, y, base_scale, thickness):
+        """
+        Automatically shrink text horizontally so it always fits in 1280 width.
+        """
+        font = cv2.FONT_HERSHEY_SIMPLEX
+
+        # Max width allowed
+        max_w = img.shape[1] - 100  # 100px margins
+
+        # Measure at base scale
+        size = cv2.getTextSize(text, font, base_scale, thickness)[0]
+
+        if size[0] > max_w:
+            scale = base_scale * (max_w / size[0])
+        else:
+            scale = base_scale
+
+        # Recalculate with final scale
+        size = cv2.getTextSize(text, font, scale, thickness)[0]
+        x = (img.shape[1] - size[0]) // 2
+
+        cv2.putText(img, text, (x, y), font, scale,
+                    (255,255,255), thickness, cv2.LINE_AA)
+
+
+    def wrap_text(text, max_width_px, scale, thickness):
+        """
+        Wrap text more aggressively by using a smaller max width.
+        """
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        words = text.split()
+        lines = []
+        cur = ""
+
+        for w in words:
+            test = cur + (" " if cur else "") + w
+            size = cv2.getTextSize(test, font, scale, thickness)[0]
+
+            # Force early wrap
+            if size[0] > max_width_px and cur != "":
+                lines.append(cur)
+                cur = w
+            else:
+                cur = test
+
+        if cur:
+            lines.append(cur)
+
+        return lines
+
+
+    y = 150
+
+    # 1) TITLE
+    put_center_text(title, "MATCHUP", y, 2.5, 6)
+    y += 100
+
+    # 2) DESCRIPTION (multi-line wrapped)
+    if description.strip():
+        lines = wrap_text(description.strip(), 900, 1.8, 4)
+        for line in lines:
+            put_center_text(title, line, y, 1.8, 4)
+            y += 70
+        y += 20  # extra spacing after block
+
+    # 3) PITCHER vs HITTER
+    vs_text = f"{pitcher_name} ({pitcher_team})  vs  {hitter_name} ({hitter_team})"
+    put_center_text(title, vs_text, y, 1.7, 4)
+    y += 90
+
+    # 4) Swing Duration
+    dur_txt = f"Swing Duration: {swing_duration_sec:.2f} sec"
+    put_center_text(title, dur_txt, y, 1.5, 3)
+    y += 70
+
+    # 5) Date
+    date_txt = datetime.now().strftime("%Y-%m-%d")
+    put_center_text(title, date_txt, y, 1.7, 4)
+
+
+    # ------------------------------------------------------------
+    # TIMELINE
+    # Output frame -> (pitch frame, swing frame, effect); the swing
+    # waiting for the pitch is index arithmetic, not padding.
+    # ------------------------------------------------------------
+    timeline = matchup_timeline(fps, len(pitch), len(swing), decision_frame)
+    manifest = to_manifest(timeline)
+    total_frames = manifest["total_frames"]
+
+    # ------------------------------------------------------------
+    # RENDER PIPELINE
+    # The timeline is cut into parts (split()); each part composes
+    # its own (frame, repeat) runs and may run on its own thread.
+    # Motion frames are composed into a reused 1280x720 buffer per
+    # part; a half is only rewritten when its source frame changes
+    # (a held swing is copied once). Each freeze is composed and
+    # tinted once into its own array, written `frames` times by the
+    # encoder and kept for the stills.
+    # ------------------------------------------------------------
+    held = {}
+
+    def part_runs(seg, first, count):
+        color = EFFECTS.get(seg["effect"])
+
+        if seg["pitch"] is None:
+            yield title, seg["frames"]
+            return
+
+        if is_hold(seg):
+            p, s = source_frames(timeline, seg, 0)
+            frame = compose(np.empty((720, 1280, 3), dtype=np.uint8), pitch[p], swing[s])
+            if color:
+                tint(frame, color, out=frame)
+            if seg.get("name"):
+                held[seg["name"]] = frame
+            yield frame, seg["frames"]
+            return
+
+        buf = np.empty((720, 1280, 3), dtype=np.uint8)
+        shown = [None, None]
+        for i in range(first, first + count):
+            p, s = source_frames(timeline, seg, i)
+            if color or shown[0] != p:
+                buf[:, :640] = pitch[p]
+            if color or shown[1] != s:
+                buf[:, 640:] = swing[s]
+            shown[:] = [None, None] if color else [p, s]
+            if color:
+                tint(buf, color, out=buf)
+            yield buf, 1
+
+    # ------------------------------------------------------------
+    # ENCODE VIDEO
+    # ------------------------------------------------------------
+    out_path = ws.path("match_out.mp4")
+
+    # frames copied out as they are composed (the encoded file is
+    # VFR, so they could not be found in it by index anyway)
+    taps = tap_positions(manifest)
+    tapped = {}
+
+    done = [0]
+    lock = threading.Lock()
+
+    def tap_and_count(seg, first, count):
+        pos = seg["start"] + first
+        for fr, repeat in part_runs(seg, first, count):
+            for p in range(pos, pos + repeat):
+                for name in taps.get(p, ()):
+                    tapped[name] = fr.copy()
+            yield fr, repeat
+            pos += repeat
+            with lock:
+                done[0] += repeat
+                if progress:
+                    progress(0.1 + 0.85 * done[0] / total_frames)
+
+    def make_part(piece):
+        return lambda: tap_and_count(*piece)
+
+    parts = [make_part(piece) for piece in split(timeline, SEGMENT_FRAMES)]
+
+    workers = threads or os.cpu_count() or 1
+
+    # title card and freezes go to the encoder as holds
+    encode_parts_to_mp4(
+        parts, 1280, 720, fps, out_path,
+        codec_args(profile, threads=1),
+        ws,
+        workers=workers,
+    )
+
+    thumb, images = render_images(tapped, held)
+
+    return out_path, thumb, manifest, images
+
+
+# ------------------------------------------------------------
+# BUILD + STORE A MATCHUP
+# Loads both clips, renders, inserts the matchups row and
+# returns its id. Runs inside a render worker process.
+# ------------------------------------------------------------
+def build_matchup(pitch_id, swing_id, description="", progress=None, threads=0, profile="preview"):
+    conn = db()
+
+    p_row = conn.execute(
+        "SELECT clip_sha, fps FROM pitch_clips WHERE id=?", (pitch_id,)
+    ).fetchone()
+
+    s_row = conn.execute(
+        "SELECT clip_sha, fps, decision_frame FROM swing_clips WHERE id=?",
+        (swing_id,)
+    ).fetchone()
+
+    # ------------------------------------------------------------
+    # FETCH PITCHER + HITTER NAMES AND TEAM NAMES
+    # ------------------------------------------------------------
+    p_meta = conn.execute("""
+        SELECT pitchers.name, teams.name
+        FROM pitch_clips
+        JOIN pitchers ON pitchers.id = pitch_clips.pitcher_id
+        JOIN teams ON teams.id = pitchers.team_id
+        WHERE pitch_clips.id=?
+    """, (pitch_id,)).fetchone()
+
+    s_meta = conn.execute("""
+        SELECT hitters.name, teams.name
+        FROM swing_clips
+        JOIN hitters ON hitters.id = swing_clips.hitter_id
+        JOIN teams ON teams.id = hitters.team_id
+        WHERE swing_clips.id=?
+    """, (swing_id,)).fetchone()
+
+    conn.close()
+
+    if not p_row or not s_row or not p_meta or not s_meta:
+        raise LookupError("Missing pitch or swing clip")
+
+    pitch_sha, pitch_fps = p_row
+    swing_sha, swing_fps, decision_frame = s_row
+    pitcher_name, pitcher_team = p_meta
+    hitter_name,  hitter_team  = s_meta
+
+    with job_workspace("matchup") as ws:
+        out_path, thumb, manifest, images = render_matchup(
+            ws,
+            frame_stack(object_path(pitch_sha), pitch_sha), pitch_fps,
+            frame_stack(object_path(swing_sha), swing_sha), swing_fps, decision_frame,
+            pitcher_name, pitcher_team, hitter_name, hitter_team, description,
+            progress=progress, threads=threads, profile=profile
+        )
+
+        matchup_sha, matchup_size = put_file(out_path)
+        thumb_sha = put_bytes(thumb)[0] if thumb else None
+
+        conn = db()
+        cur = conn.execute("""
+            INSERT INTO matchups
+            (pitch_clip_id, swing_clip_id, description,
+             matchup_sha, matchup_size, thumb_sha, manifest, created_at)
+            VALUES (?,?,?,?,?,?,?,?)""",
+            (pitch_id, swing_id, description,
+             matchup_sha, matchup_size, thumb_sha, json.dumps(manifest), datetime.now()))
+        matchup_id = cur.lastrowid
+
+        for variant, (data, w, h) in images.items():
+            save_image(conn, "matchup", matchup_id, variant, data, w, h)
+        refresh_summary(conn, matchup_id)
+        conn.commit()
+        conn.close()
+
+        # adaptive-bitrate ladder for playback, best effort: the matchup
+        # is saved either way and without hls_sha plays the mp4
+        # (package_hls.py retries those)
+        try:
+            hls_sha, hls_shas = package_hls(
+                ws, out_path, manifest["fps"], manifest["width"], manifest["height"],
+                workers=threads or os.cpu_count() or 1,
+            )
+        except Exception:
+            traceback.print_exc()
+            hls_sha = None
+
+    if hls_sha:
+        conn = db()
+        # unless deleted while the ladder was encoding
+        if conn.execute("SELECT 1 FROM matchups WHERE id=?", (matchup_id,)).fetchone():
+            save_hls(conn, matchup_id, hls_sha, hls_shas)
+            conn.commit()
+        conn.close()
+
+    return matchup_id
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import tempfile
+import time
+
+# ------------------------------------------------------------
+# CONTENT-ADDRESSED MEDIA STORE
+# Video and image payloads live on disk as
+#     <GF_STORE_DIR>/<sha[:2]>/<sha>
+# and the database only keeps the SHA-256 (plus size). Identical
+# payloads are stored once.
+# ------------------------------------------------------------
+STORE_DIR = os.environ.get("GF_STORE_DIR", "media")
+
+CHUNK = 1024 * 1024
+
+# every (table, column) that references a stored object; gc() keeps
+# anything listed here
+REFERENCES = [
+    ("pitch_clips", "clip_sha"),
+    ("swing_clips", "clip_sha"),
+    ("matchups", "matchup_sha"),
+    ("matchups", "thumb_sha"),
+    ("matchups", "hls_sha"),
+    ("matchup_hls", "sha"),
+    ("matchup_summary", "thumb_sha"),
+    ("images", "sha"),
+]
+
+
+def object_path(sha):
+    return os.path.join(STORE_DIR, sha[:2], sha)
+
+
+def exists(sha):
+    return bool(sha) and os.path.exists(object_path(sha))
+
+
+def commit_tmp(tmp, sha):
+    """Atomically move a fully written temp file into place."""
+    dest = object_path(sha)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+    if os.path.exists(dest):
+        # same content already stored; refresh mtime so gc() treats
+        # it as freshly written
+        os.remove(tmp)
+        os.utime(dest)
+    else:
+        os.replace(tmp, dest)
+
+
+def new_tmp_file():
+    os.makedirs(STORE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".incoming_", dir=STORE_DIR)
+    return os.fdopen(fd, "wb"), tmp
+
+
+def put_bytes(data):
+    """Store bytes. Returns (sha, size)."""
+    sha = hashlib.sha256(data).hexdigest()
+    if exists(sha):
+        os.utime(object_path(sha))
+        return sha, len(data)
+
+    f, tmp = new_tmp_file()
+    with f:
+        f.write(data)
+    commit_tmp(tmp, sha)
+
+    return sha, len(data)
+
+
+def put_stream(src):
+    """Copy a readable file-like object into the store in chunks. Returns (sha, size)."""
+    h = hashlib.sha256()
+    size = 0
+
+    f, tmp = new_tmp_file()
+    try:
+        with f:
+            while True:
+                chunk = src.read(CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except:
+        os.remove(tmp)
+        raise
+
+    sha = h.hexdigest()
+    commit_tmp(tmp, sha)
+
+    return sha, size
+
+
+def put_file(path):
+    """Copy a file into the store. Returns (sha, size)."""
+    with open(path, "rb") as src:
+        return put_stream(src)
+
+
+def read_bytes(sha):
+    with open(object_path(sha), "rb") as f:
+        return f.read()
+
+
+# ------------------------------------------------------------
+# GARBAGE COLLECTION
+# ------------------------------------------------------------
+def referenced(conn):
+    """All shas referenced by any row."""
+    keep = set()
+    for table, col in REFERENCES:
+        rows = conn.execute(
+            f"SELECT {col} FROM {table} WHERE {col} IS NOT NULL"
+        ).fetchall()
+        keep.update(r[0] for r in rows)
+    return keep
+
+
+def gc(conn, grace_sec=3600, dry_run=False):
+    """
+    Delete stored objects no row references. Objects (and leftover
+    .incoming_ temp files) younger than grace_sec are kept so a
+    write whose row is not committed yet is never collected.
+    Returns (files removed, bytes freed).
+    """
+    keep = referenced(conn)
+    cutoff = time.time() - grace_sec
+
+    removed = 0
+    freed = 0
+
+    if not os.path.isdir(STORE_DIR):
+        return removed, freed
+
+    for root, dirs, files in os.walk(STORE_DIR):
+        for name in files:
+            if name in keep:
+                continue
+
+            p = os.path.join(root, name)
+            st = os.stat(p)
+            if st.st_mtime > cutoff:
+                continue
+
+            if not dry_run:
+                os.remove(p)
+            removed += 1
+            freed += st.st_size
+
+    return removed, freed
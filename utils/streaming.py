@@ -0,0 +1,190 @@
+import os
+import re
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import Response, StreamingResponse
+
+# ------------------------------------------------------------
+# HTTP RANGE STREAMING FROM A FILE
+# Used by /stream/* and the download routes. The body is read from
+# disk in CHUNK-sized pieces with os.pread, so a scrub request for a
+# few KB of a large video costs a few KB of I/O and memory.
+#
+# Supports:
+#   Range: bytes=a-b | a- | -n   (single → 206)
+#   Range: bytes=a-b, c-d        (multi  → 206 multipart/byteranges)
+#   If-Range (ETag or date), If-None-Match, If-Modified-Since
+# ------------------------------------------------------------
+CHUNK = 64 * 1024
+
+# more ranges than this in one request is treated as no Range at all
+MAX_RANGES = 16
+
+RANGE_SPEC = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def parse_ranges(header, size):
+    """
+    Parse a Range header into a list of (start, end) inclusive pairs.
+    Returns None when the header is absent/malformed (serve the whole
+    file) and [] when it is well formed but nothing is satisfiable.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    ranges = []
+    for spec in header[len("bytes="):].split(","):
+        m = RANGE_SPEC.match(spec)
+        if not m or (m.group(1) == "" and m.group(2) == ""):
+            return None
+
+        first, last = m.group(1), m.group(2)
+
+        if first == "":
+            # suffix range: last N bytes
+            n = int(last)
+            if n == 0:
+                continue
+            start, end = max(0, size - n), size - 1
+        else:
+            start = int(first)
+            end = size - 1 if last == "" else min(int(last), size - 1)
+            if last != "" and int(last) < start:
+                return None
+
+        if start < size:
+            ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    return ranges
+
+
+def read_range(path, start, end):
+    """Yield bytes [start, end] of a file in CHUNK-sized pieces."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        pos = start
+        while pos <= end:
+            data = os.pread(fd, min(CHUNK, end - pos + 1), pos)
+            if not data:
+                break
+            pos += len(data)
+            yield data
+    finally:
+        os.close(fd)
+
+
+def not_modified(request, etag, mtime=None):
+    """etag quoted; mtime None when the response has no Last-Modified."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip() for t in inm.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    ims = request.headers.get("if-modified-since")
+    if ims and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def if_range_matches(request, etag, last_modified):
+    """True when a Range request may be honoured (RFC 9110 §13.1.5)."""
+    value = request.headers.get("if-range")
+    if value is None:
+        return True
+    value = value.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag
+    return value == last_modified
+
+
+def stream_file(request, path, media_type, etag=None, headers=None):
+    """
+    Build a 200 / 206 / 304 / 416 response for a file on disk.
+    etag: strong validator (media store sha) without quotes
+    headers: extra headers (e.g. Content-Disposition)
+    """
+    st = os.stat(path)
+    size = st.st_size
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    etag = f'"{etag}"' if etag else f'"{int(st.st_mtime)}-{size}"'
+
+    base = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        **(headers or {}),
+    }
+
+    if not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=base)
+
+    ranges = None
+    if if_range_matches(request, etag, last_modified):
+        ranges = parse_ranges(request.headers.get("range"), size)
+
+    # ---------- whole file ----------
+    if ranges is None:
+        return StreamingResponse(
+            read_range(path, 0, size - 1),
+            status_code=200,
+            media_type=media_type,
+            headers={**base, "Content-Length": str(size)},
+        )
+
+    # ---------- nothing satisfiable ----------
+    if not ranges:
+        return Response(
+            status_code=416,
+            headers={**base, "Content-Range": f"bytes */{size}"},
+        )
+
+    # ---------- single range ----------
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return StreamingResponse(
+            read_range(path, start, end),
+            status_code=206,
+            media_type=media_type,
+            headers={
+                **base,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+
+    # ---------- multiple ranges ----------
+    boundary = uuid.uuid4().hex
+    parts = []
+    length = 0
+    for start, end in ranges:
+        head = (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        parts.append((head, start, end))
+        length += len(head) + (end - start + 1) + 2
+    tail = f"--{boundary}--\r\n".encode()
+    length += len(tail)
+
+    def body():
+        for head, start, end in parts:
+            yield head
+            yield from read_range(path, start, end)
+            yield b"\r\n"
+        yield tail
+
+    return StreamingResponse(
+        body(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={**base, "Content-Length": str(length)},
+    )
@@ -0,0 +1,124 @@
+# ------------------------------------------------------------
+# MATCHUP SUMMARY (READ MODEL)
+# One row per matchup with everything the library lists and
+# filters on, so those pages read one indexed table instead of
+# joining matchups → clips → players → teams on both sides:
+#
+#   names     pitcher / hitter and their teams (ids and names)
+#   swing     swing_frames and swing_sec of the swing as rendered
+#   freezes   matchup frame of the start / decision / contact holds
+#   thumb     thumb_sha (see /thumbnail/matchup for the variants)
+#
+# The write paths keep it current: build_matchup and
+# backfill_matchup_stills call refresh_summary(), matchup delete
+# calls delete_summary(). rebuild_matchup_summary.py recomputes
+# every row if it ever drifts (hand edits, older code).
+#
+# Names are those the matchup was built with: when a clip, player
+# or team has since been deleted, a refresh keeps the stored value
+# instead of blanking it.
+# ------------------------------------------------------------
+TABLE = """
+CREATE TABLE IF NOT EXISTS matchup_summary (
+    matchup_id INTEGER PRIMARY KEY,
+    description TEXT,
+    pitch_clip_id INTEGER,
+    swing_clip_id INTEGER,
+    pitcher_id INTEGER,
+    pitcher_name TEXT,
+    pitcher_team_id INTEGER,
+    pitcher_team TEXT,
+    hitter_id INTEGER,
+    hitter_name TEXT,
+    hitter_team_id INTEGER,
+    hitter_team TEXT,
+    fps REAL,
+    swing_frames INTEGER,
+    swing_sec REAL,
+    start_frame INTEGER,
+    decision_frame INTEGER,
+    contact_frame INTEGER,
+    thumb_sha TEXT,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_matchup_summary_created
+    ON matchup_summary(created_at);
+CREATE INDEX IF NOT EXISTS idx_matchup_summary_pitcher_team
+    ON matchup_summary(pitcher_team_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_matchup_summary_pitcher
+    ON matchup_summary(pitcher_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_matchup_summary_hitter_team
+    ON matchup_summary(hitter_team_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_matchup_summary_hitter
+    ON matchup_summary(hitter_id, created_at);
+"""
+
+# legacy rows may have no manifest (or one that is not JSON, which
+# json_extract would raise on): their swing / freeze columns are NULL
+MANIFEST = "CASE WHEN json_valid(m.manifest) THEN m.manifest END"
+
+# the contact hold shows the last swing frame (utils/timeline.py)
+REFRESH = f"""
+INSERT OR REPLACE INTO matchup_summary (
+    matchup_id, description, pitch_clip_id, swing_clip_id,
+    pitcher_id, pitcher_name, pitcher_team_id, pitcher_team,
+    hitter_id, hitter_name, hitter_team_id, hitter_team,
+    fps, swing_frames, swing_sec,
+    start_frame, decision_frame, contact_frame,
+    thumb_sha, created_at
+)
+SELECT
+    m.id, m.description, m.pitch_clip_id, m.swing_clip_id,
+
+    COALESCE(p.id, s.pitcher_id),
+    COALESCE(p.name, s.pitcher_name),
+    COALESCE(pt.id, s.pitcher_team_id),
+    COALESCE(pt.name, s.pitcher_team),
+
+    COALESCE(h.id, s.hitter_id),
+    COALESCE(h.name, s.hitter_name),
+    COALESCE(ht.id, s.hitter_team_id),
+    COALESCE(ht.name, s.hitter_team),
+
+    json_extract({MANIFEST}, '$.fps'),
+    json_extract({MANIFEST}, '$.freezes.contact.swing') + 1,
+    (json_extract({MANIFEST}, '$.freezes.contact.swing') + 1.0)
+        / json_extract({MANIFEST}, '$.fps'),
+
+    json_extract({MANIFEST}, '$.freezes.start.frame'),
+    json_extract({MANIFEST}, '$.freezes.decision.frame'),
+    json_extract({MANIFEST}, '$.freezes.contact.frame'),
+
+    m.thumb_sha, m.created_at
+FROM matchups m
+LEFT JOIN pitch_clips pc ON pc.id = m.pitch_clip_id
+LEFT JOIN pitchers p ON p.id = pc.pitcher_id
+LEFT JOIN teams pt ON pt.id = p.team_id
+LEFT JOIN swing_clips sc ON sc.id = m.swing_clip_id
+LEFT JOIN hitters h ON h.id = sc.hitter_id
+LEFT JOIN teams ht ON ht.id = h.team_id
+LEFT JOIN matchup_summary s ON s.matchup_id = m.id
+"""
+
+
+def refresh_summary(conn, matchup_id):
+    """(Re)write one matchup's row (caller commits)."""
+    conn.execute(REFRESH + " WHERE m.id = ?", (matchup_id,))
+
+
+def delete_summary(conn, matchup_id):
+    conn.execute("DELETE FROM matchup_summary WHERE matchup_id=?", (matchup_id,))
+
+
+def rebuild_summary(conn):
+    """
+    Recompute every row and drop rows of deleted matchups
+    (caller commits). Returns the number of rows.
+    """
+    conn.execute(
+        "DELETE FROM matchup_summary "
+        "WHERE matchup_id NOT IN (SELECT id FROM matchups)"
+    )
+    conn.execute(REFRESH)
+    return conn.execute("SELECT COUNT(*) FROM matchup_summary").fetchone()[0]
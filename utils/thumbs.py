@@ -0,0 +1,164 @@
+from datetime import datetime
+
+import cv2
+from fastapi.responses import HTMLResponse
+
+from utils.db import db
+from utils.store import exists, object_path, put_bytes
+from utils.streaming import stream_file
+
+# ------------------------------------------------------------
+# STORED IMAGE VARIANTS
+# Thumbnails (and later other stills) are rendered once, written to
+# the media store and indexed in the images table:
+#
+#   images(owner, owner_id, variant) -> sha, width, height
+#
+# owner is the table the image belongs to ("pitch", "swing", ...);
+# variant names the size ("w120", "w240", "w480").
+# ------------------------------------------------------------
+THUMB_WIDTHS = [120, 240, 480]
+DEFAULT_WIDTH = 120
+JPEG_QUALITY = 85
+
+# stored images never change under a given sha; browsers may keep
+# them for a month and revalidate with the ETag after that
+CACHE_CONTROL = "public, max-age=2592000"
+
+CLIP_TABLES = {"pitch": "pitch_clips", "swing": "swing_clips"}
+
+
+def variant_name(width):
+    return f"w{width}"
+
+
+def pick_width(width):
+    """Smallest stored width >= the requested one (largest if none)."""
+    for w in THUMB_WIDTHS:
+        if w >= width:
+            return w
+    return THUMB_WIDTHS[-1]
+
+
+def encode_sizes(frame, widths=THUMB_WIDTHS):
+    """Yield (variant, jpeg bytes, width, height) for each width."""
+    h, w = frame.shape[:2]
+    for width in widths:
+        height = max(1, int(round(h * width / w)))
+        img = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if ok:
+            yield variant_name(width), jpg.tobytes(), width, height
+
+
+def save_image(conn, owner, owner_id, variant, data, width, height):
+    """Store one image and (re)point its row at it (caller commits)."""
+    sha, size = put_bytes(data)
+    conn.execute(
+        "INSERT OR REPLACE INTO images (owner, owner_id, variant, sha, width, height, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (owner, owner_id, variant, sha, width, height, datetime.now())
+    )
+    return sha
+
+
+def save_thumbs(conn, owner, owner_id, frame):
+    """Store every thumbnail size of one frame (caller commits)."""
+    for variant, data, width, height in encode_sizes(frame):
+        save_image(conn, owner, owner_id, variant, data, width, height)
+
+
+def get_image(conn, owner, owner_id, variant):
+    """(sha, width, height) or None."""
+    return conn.execute(
+        "SELECT sha, width, height FROM images WHERE owner=? AND owner_id=? AND variant=?",
+        (owner, owner_id, variant)
+    ).fetchone()
+
+
+def delete_images(conn, owner, owner_id):
+    """Drop the rows; the store objects go with the next gc."""
+    conn.execute("DELETE FROM images WHERE owner=? AND owner_id=?", (owner, owner_id))
+
+
+# ------------------------------------------------------------
+# CLIP THUMBNAILS
+# ------------------------------------------------------------
+def first_frame(path):
+    cap = cv2.VideoCapture(path)
+    ret, frame = cap.read()
+    cap.release()
+    return frame if ret else None
+
+
+def ensure_clip_thumbs(conn, kind, clip_id):
+    """
+    Generate thumbnails for a clip stored before thumbnails existed.
+    Returns True when the clip has thumbnails afterwards.
+    """
+    if get_image(conn, kind, clip_id, variant_name(DEFAULT_WIDTH)):
+        return True
+
+    row = conn.execute(
+        f"SELECT clip_sha FROM {CLIP_TABLES[kind]} WHERE id=?", (clip_id,)
+    ).fetchone()
+    if not row or not exists(row[0]):
+        return False
+
+    frame = first_frame(object_path(row[0]))
+    if frame is None:
+        return False
+
+    save_thumbs(conn, kind, clip_id, frame)
+    conn.commit()
+    return True
+
+
+def clip_thumbnail(request, kind, clip_id, width=DEFAULT_WIDTH):
+    """Response for /thumbnail/<kind>: the stored JPEG, with ETag and caching."""
+    variant = variant_name(pick_width(width))
+
+    conn = db()
+    img = get_image(conn, kind, clip_id, variant)
+    if img is None and ensure_clip_thumbs(conn, kind, clip_id):
+        img = get_image(conn, kind, clip_id, variant)
+    conn.close()
+
+    if not img or not exists(img[0]):
+        return HTMLResponse("not found", status_code=404)
+
+    return stream_file(
+        request, object_path(img[0]), "image/jpeg",
+        etag=img[0], headers={"Cache-Control": CACHE_CONTROL},
+    )
+
+
+# ------------------------------------------------------------
+# MATCHUP FIRST FRAME
+# /play/matchup/pitch_start has always been the pitch half of the
+# matchup video's first frame. Stored as variant "first_pitch" the
+# first time it is asked for.
+# ------------------------------------------------------------
+def ensure_first_pitch(conn, matchup_id):
+    """(sha, width, height) of the matchup's first-frame pitch half, or None."""
+    img = get_image(conn, "matchup", matchup_id, "first_pitch")
+    if img:
+        return img
+
+    row = conn.execute("SELECT matchup_sha FROM matchups WHERE id=?", (matchup_id,)).fetchone()
+    if not row or not exists(row[0]):
+        return None
+
+    frame = first_frame(object_path(row[0]))
+    if frame is None:
+        return None
+
+    # the pitch clip is the left half of the side-by-side render
+    pitch = frame[:, : frame.shape[1] // 2]
+    ok, jpg = cv2.imencode(".jpg", pitch, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        return None
+
+    save_image(conn, "matchup", matchup_id, "first_pitch", jpg.tobytes(), pitch.shape[1], pitch.shape[0])
+    conn.commit()
+    return get_image(conn, "matchup", matchup_id, "first_pitch")
@@ -0,0 +1,162 @@
+# ------------------------------------------------------------
+# MATCHUP TIMELINE
+# A matchup is a list of segments; each maps a run of output frames
+# to source frames of the pitch and swing clips:
+#
+#   {"kind": "title" | "play" | "freeze",
+#    "name": "start" | "decision" | "contact"      (freezes)
+#    "start": first output frame, "frames": count,
+#    "pitch": first pitch source frame, "pitch_step": advance per output frame,
+#    "swing": first swing source frame, "swing_step": ...,
+#    "effect": "yellow" | "green" | None}
+#
+# Output frame i of a segment shows pitch frame
+# pitch + floor(i * pitch_step) and the swing equivalent, clamped to
+# the clip. step 1 plays, 0 holds, 0.5 is half-speed slow motion.
+# Waiting for the swing, freezes and slow motion are all index
+# arithmetic: the renderer never copies or pads source frames.
+# ------------------------------------------------------------
+EFFECTS = {
+    "yellow": (0, 255, 255),
+    "green": (0, 255, 0),
+}
+
+
+def new_timeline(fps, pitch_len, swing_len):
+    return {"fps": fps, "pitch_len": pitch_len, "swing_len": swing_len, "segments": []}
+
+
+def add_segment(timeline, kind, frames, pitch=None, swing=None,
+                pitch_step=1, swing_step=1, effect=None, name=None):
+    """Append a segment (skipped when it has no frames). Returns it."""
+    segments = timeline["segments"]
+    start = segments[-1]["start"] + segments[-1]["frames"] if segments else 0
+    seg = {
+        "kind": kind,
+        "start": start,
+        "frames": max(0, int(frames)),
+        "pitch": pitch,
+        "pitch_step": pitch_step,
+        "swing": swing,
+        "swing_step": swing_step,
+        "effect": effect,
+    }
+    if name:
+        seg["name"] = name
+    if seg["frames"]:
+        segments.append(seg)
+    return seg
+
+
+def source_frames(timeline, seg, i):
+    """(pitch index, swing index) shown at frame i of a segment."""
+    p = min(timeline["pitch_len"] - 1, max(0, seg["pitch"] + int(i * seg["pitch_step"])))
+    s = min(timeline["swing_len"] - 1, max(0, seg["swing"] + int(i * seg["swing_step"])))
+    return p, s
+
+
+def frame_at(timeline, n):
+    """(segment, pitch index, swing index) for output frame n, or None."""
+    for seg in timeline["segments"]:
+        if seg["start"] <= n < seg["start"] + seg["frames"]:
+            if seg["pitch"] is None:
+                return seg, None, None
+            return (seg, *source_frames(timeline, seg, n - seg["start"]))
+    return None
+
+
+def total_frames(timeline):
+    return sum(seg["frames"] for seg in timeline["segments"])
+
+
+def is_hold(seg):
+    """Every frame of the segment shows the same picture."""
+    return seg["pitch"] is None or (seg["pitch_step"] == 0 and seg["swing_step"] == 0)
+
+
+def split(timeline, max_frames):
+    """
+    Cut the timeline into independently renderable pieces:
+    [(segment, first frame in segment, frames)]. Holds stay whole;
+    moving segments are cut every max_frames.
+    """
+    pieces = []
+    for seg in timeline["segments"]:
+        if is_hold(seg):
+            pieces.append((seg, 0, seg["frames"]))
+            continue
+        for first in range(0, seg["frames"], max_frames):
+            pieces.append((seg, first, min(max_frames, seg["frames"] - first)))
+    return pieces
+
+
+# ------------------------------------------------------------
+# STANDARD MATCHUP LAYOUT
+# Title card, then the pitch plays while the swing waits on its
+# first frame until both clips end together at contact:
+#
+#   title 5 s | pitch plays, swing held | START freeze (yellow)
+#   | both play | DECISION freeze (green) | both play
+#   | CONTACT freeze | pitch plays out, swing held
+#
+# decision_frame is relative to the swing clip; freezes last 2 s.
+# ------------------------------------------------------------
+def matchup_timeline(fps, pitch_len, swing_len, decision_frame):
+    t = new_timeline(fps, pitch_len, swing_len)
+
+    # pitch frame shown alongside swing frame s
+    offset = max(0, pitch_len - swing_len)
+    contact = swing_len - 1
+    hold = int(fps * 2)
+
+    t["swing_offset"] = offset
+
+    add_segment(t, "title", int(fps * 5))
+    add_segment(t, "play", offset, 0, 0, swing_step=0)
+    add_segment(t, "freeze", hold, offset, 0, 0, 0, "yellow", "start")
+    add_segment(t, "play", decision_frame - 1, offset + 1, 1)
+    add_segment(t, "freeze", hold, decision_frame + offset, decision_frame, 0, 0, "green", "decision")
+    add_segment(t, "play", contact - decision_frame - 1, decision_frame + offset + 1, decision_frame + 1)
+    add_segment(t, "freeze", hold, contact + offset, contact, 0, 0, None, "contact")
+    add_segment(t, "play", pitch_len - contact - offset - 1, contact + offset + 1, contact, swing_step=0)
+
+    return t
+
+
+# ------------------------------------------------------------
+# MANIFEST (stored with each matchup)
+# Frame numbers are positions on the nominal fps timeline
+# (t = frame / fps); the encoded file stores each hold as two coded
+# frames, so they are not coded-frame indices.
+# ------------------------------------------------------------
+def to_manifest(timeline):
+    segments = []
+    for seg in timeline["segments"]:
+        out = dict(seg)
+        if seg["pitch"] is not None:
+            out["pitch"], out["swing"] = source_frames(timeline, seg, 0)
+            out["swing_held"] = seg["swing_step"] == 0
+        segments.append(out)
+
+    fps = timeline["fps"]
+    title = next((s for s in segments if s["kind"] == "title"), None)
+
+    return {
+        "version": 2,
+        "fps": fps,
+        "width": 1280,
+        "height": 720,
+        "total_frames": total_frames(timeline),
+        "title": [0, title["frames"]] if title else [0, 0],
+        "swing_offset": timeline.get("swing_offset", 0),
+        "freezes": {
+            s["name"]: {
+                "frame": s["start"],
+                "frames": s["frames"],
+                "pitch": s["pitch"],
+                "swing": s["swing"],
+            }
+            for s in segments if s["kind"] == "freeze"
+        },
+        "segments": segments,
+    }
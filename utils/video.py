@@ -3,45 +3,288 @@ import numpy as np
 import imageio_ffmpeg as ffmpeg
 import subprocess
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-def encode_raw_frames_to_mp4(frames, fps, out_path):
+from utils import encoding
+from utils.mp4index import avc_config
+
+def probe_video(path):
+    """Return (fps, frame count) from the container; (0, 0) if unreadable."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, total
+
+
+def letterbox(f, w=640, h=720, out=None):
     """
-    Encode a list of BGR frames to MP4 using ffmpeg.
-    frames: list of np.ndarray (H,W,3)
-    fps: float
-    out_path: target mp4 file path
+    Fit a frame inside w x h, centred on black bars.
+    out: optional (h, w, 3) uint8 array to write into instead of a new one
     """
+    H, W = f.shape[:2]
+    s = min(w / W, h / H)
+    nw, nh = int(W * s), int(H * s)
 
-    if not frames:
-        raise ValueError("encode_raw_frames_to_mp4: no frames provided")
+    y = (h - nh) // 2
+    x = (w - nw) // 2
 
-    h, w = frames[0].shape[:2]
+    if out is None:
+        out = np.zeros((h, w, 3), dtype=np.uint8)
+    else:
+        # only the bars need clearing; the picture overwrites the rest
+        out[:y] = 0
+        out[y+nh:] = 0
+        out[y:y+nh, :x] = 0
+        out[y:y+nh, x+nw:] = 0
 
-    raw_path = out_path + ".yuv"
+    out[y:y+nh, x:x+nw] = cv2.resize(f, (nw, nh))
+    return out
 
-    # write raw bgr frames
-    with open(raw_path, "wb") as f:
-        for fr in frames:
-            f.write(fr.astype(np.uint8).tobytes())
 
+def open_raw_encoder(w, h, fps, out_path, codec_args):
+    """
+    Start an ffmpeg process that reads raw BGR24 frames from stdin.
+    codec_args: output options placed between the input and out_path
+    """
     exe = ffmpeg.get_ffmpeg_exe()
 
     cmd = [
         exe,
         "-y",
+        "-loglevel", "error",
         "-f", "rawvideo",
         "-pix_fmt", "bgr24",
         "-s", f"{w}x{h}",
         "-r", str(fps),
-        "-i", raw_path,
-        "-c:v", "libx264",
-        "-preset", "veryfast",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
+        "-i", "pipe:0",
+        *codec_args,
         out_path,
     ]
 
-    subprocess.run(cmd, check=True)
+    # stderr goes to a temp file, not a pipe: nothing reads it while
+    # frames are written, and ffmpeg blocking on a full stderr pipe
+    # would leave us blocked on its stdin
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=log,
+    )
+    proc.log = log
+    return proc
+
+
+def close_encoder(proc):
+    """Close an open_raw_encoder's stdin and wait; raises on failure."""
+    try:
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+    rc = proc.wait()
+
+    proc.log.seek(0)
+    err = proc.log.read()
+    proc.log.close()
+    if rc != 0:
+        raise subprocess.CalledProcessError(rc, proc.args, stderr=err)
+
+
+def pipe_frames_to_mp4(frames, w, h, fps, out_path, codec_args):
+    """
+    Stream BGR frames into ffmpeg one at a time.
+    frames: any iterable of np.ndarray (h,w,3); a generator keeps
+    memory at a few frames and lets x264 encode while frames are
+    still being composed.
+    """
+    pipe_runs_to_mp4(((fr, 1) for fr in frames), w, h, fps, out_path, codec_args)
+
+
+def pipe_runs_to_mp4(runs, w, h, fps, out_path, codec_args):
+    """
+    Like pipe_frames_to_mp4, but runs yields (frame, repeat) pairs:
+    a held frame is converted once and its buffer written `repeat`
+    times. The frame may be a reused buffer; it is fully written to
+    the pipe before the next pair is requested.
+    """
+    proc = open_raw_encoder(w, h, fps, out_path, codec_args)
+
+    try:
+        for fr, repeat in runs:
+            data = np.ascontiguousarray(fr, dtype=np.uint8).data
+            for _ in range(repeat):
+                proc.stdin.write(data)
+    except BrokenPipeError:
+        # ffmpeg died early; its stderr (raised below) explains why
+        pass
+    except:
+        proc.kill()
+        proc.wait()
+        proc.log.close()
+        raise
+
+    close_encoder(proc)
+
+
+def encode_raw_frames_to_mp4(frames, fps, out_path, profile="preview"):
+    """
+    Encode BGR frames to MP4 using ffmpeg.
+    frames: list or iterator of np.ndarray (H,W,3)
+    fps: float
+    out_path: target mp4 file path
+    profile: utils/encoding profile name
+    """
+
+    frames = iter(frames)
+    first = next(frames, None)
+
+    if first is None:
+        raise ValueError("encode_raw_frames_to_mp4: no frames provided")
+
+    h, w = first.shape[:2]
+
+    def all_frames():
+        yield first
+        yield from frames
+
+    pipe_frames_to_mp4(all_frames(), w, h, fps, out_path, encoding.codec_args(profile))
+
+
+# ------------------------------------------------------------
+# SEGMENTED ENCODE WITH ENCODER-LEVEL HOLDS
+# A frame repeated HOLD_MIN+ times is not pushed through x264 as
+# identical frames. It becomes its own segment of two coded frames
+# (at the first and last timestamp of the hold), so a 5 s title
+# card costs the same to encode as a single frame. Runs of distinct
+# frames between holds are encoded as ordinary segments. All
+# segments use identical encoder settings and are joined with the
+# concat demuxer and stream copy.
+#
+# The result is variable frame rate: a hold is one picture shown
+# for its full duration. Positions on the nominal fps timeline
+# (t = frame / fps) are unchanged.
+# ------------------------------------------------------------
+HOLD_MIN = 3
+
+
+def encode_segments(runs, w, h, fps, codec_args, path_for):
+    """
+    Encode (frame, repeat) runs into hold / motion segment files.
+    path_for(n): path of the n-th segment. Returns [(path, frames)].
+    """
+    segments = []       # (path, frames)
+    motion = [None]     # open encoder for the current motion segment
+
+    def end_motion():
+        if motion[0]:
+            close_encoder(motion[0])
+            motion[0] = None
+
+    try:
+        for fr, repeat in runs:
+            data = np.ascontiguousarray(fr, dtype=np.uint8).data
+
+            if repeat >= HOLD_MIN:
+                end_motion()
+
+                # second frame moved to the hold's last timestamp; its
+                # duration stays 1/fps, so the segment lasts repeat/fps
+                path = path_for(len(segments))
+                proc = open_raw_encoder(
+                    w, h, fps, path,
+                    ["-vf", f"setpts=N*{repeat - 1}/({fps}*TB)", *codec_args,
+                     "-fps_mode", "passthrough"],
+                )
+                proc.stdin.write(data)
+                proc.stdin.write(data)
+                close_encoder(proc)
+                segments.append((path, repeat))
+                continue
+
+            if motion[0] is None:
+                path = path_for(len(segments))
+                motion[0] = open_raw_encoder(w, h, fps, path, codec_args)
+                segments.append((path, 0))
+
+            for _ in range(repeat):
+                motion[0].stdin.write(data)
+            path, n = segments[-1]
+            segments[-1] = (path, n + repeat)
+
+        end_motion()
+    finally:
+        if motion[0]:
+            motion[0].kill()
+            motion[0].wait()
+            motion[0].log.close()
+
+    return segments
+
+
+def encode_runs_to_mp4(runs, w, h, fps, out_path, codec_args, ws):
+    """
+    runs: (frame, repeat) pairs as for pipe_runs_to_mp4
+    ws:   workspace for the segment files
+    """
+    encode_parts_to_mp4([lambda: runs], w, h, fps, out_path, codec_args, ws)
+
+
+# ------------------------------------------------------------
+# PARALLEL SEGMENT ENCODE
+# The caller splits the video into parts it can produce on its own
+# (a matchup timeline can compose any frame range). Up to `workers`
+# parts are composed and encoded at once, each by a thread feeding
+# its own ffmpeg process; numpy copies and pipe writes release the
+# GIL, so the work spreads across cores. Segments are joined in
+# part order like encode_runs_to_mp4.
+# ------------------------------------------------------------
+def encode_parts_to_mp4(parts, w, h, fps, out_path, codec_args, ws, workers=1):
+    """
+    parts:   zero-argument callables returning the (frame, repeat)
+             runs of consecutive stretches of the video, in order
+    workers: parts encoded concurrently
+    """
+    def encode_part(k):
+        return encode_segments(
+            parts[k](), w, h, fps, codec_args,
+            lambda n: ws.path(f"seg_{k:04d}_{n:04d}.mp4"),
+        )
+
+    if workers > 1 and len(parts) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(encode_part, range(len(parts))))
+    else:
+        results = [encode_part(k) for k in range(len(parts))]
+
+    segments = [seg for part in results for seg in part]
+    if not segments:
+        raise ValueError("encode_parts_to_mp4: no frames provided")
+
+    concat_segments(segments, fps, out_path, codec_args, ws)
+
+
+def concat_segments(segments, fps, out_path, codec_args, ws):
+    """Join segment files; stream copy when their SPS/PPS agree."""
+    list_path = ws.path("segments.txt")
+    with open(list_path, "w") as f:
+        for path, frames in segments:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+            f.write(f"duration {frames / fps}\n")
+
+    configs = {str(avc_config(path)) for path, _ in segments}
+
+    if len(configs) == 1:
+        codec = ["-c", "copy", "-movflags", "+faststart"]
+    else:
+        # parameter sets differ: decoding would break at a join, so
+        # pay for one re-encode instead
+        codec = codec_args
 
-    if os.path.exists(raw_path):
-        os.remove(raw_path)
+    subprocess.run(
+        [ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+         "-f", "concat", "-safe", "0", "-i", list_path,
+         *codec, out_path],
+        check=True, capture_output=True,
+    )
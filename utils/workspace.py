@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# ------------------------------------------------------------
+# SCRATCH LOCATION
+#   GF_SCRATCH_DIR    explicit directory for job scratch space
+#   GF_SCRATCH_TMPFS  "1" → use /dev/shm (RAM) when available
+# ------------------------------------------------------------
+SCRATCH_DIR = os.environ.get("GF_SCRATCH_DIR", "")
+SCRATCH_TMPFS = os.environ.get("GF_SCRATCH_TMPFS", "0") == "1"
+
+
+def scratch_root():
+    """Directory that job workspaces are created under."""
+    if SCRATCH_DIR:
+        os.makedirs(SCRATCH_DIR, exist_ok=True)
+        return SCRATCH_DIR
+
+    if SCRATCH_TMPFS and os.path.isdir("/dev/shm"):
+        return "/dev/shm"
+
+    return tempfile.gettempdir()
+
+
+class Workspace:
+    """A private directory owned by one render/encode job."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+
+@contextmanager
+def job_workspace(kind="job"):
+    """
+    Create a unique scratch directory for one job and remove it,
+    with everything inside, when the block exits (even on error).
+
+        with job_workspace("matchup") as ws:
+            out = ws.path("out.mp4")
+    """
+    root = tempfile.mkdtemp(prefix=f"gf_{kind}_", dir=scratch_root())
+    try:
+        yield Workspace(root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)